@@ -2,17 +2,15 @@ import { NextResponse } from "next/server"
 
 export async function POST(request: Request) {
   try {
-    // In a real app, handle file upload using middleware
-    // like formidable, multer or the built-in Request.formData()
-    const formData = await request.formData()
-    const file = formData.get("file") as File
+    // The file is the raw request body and is streamed through, never held in memory
+    const filename = new URL(request.url).searchParams.get("filename")
 
-    if (!file) {
+    if (!filename || !request.body) {
       return NextResponse.json({ success: false, message: "No file uploaded" }, { status: 400 })
     }
 
     // Validate file type
-    const fileType = file.name.split('.').pop()?.toLowerCase()
+    const fileType = filename.split('.').pop()?.toLowerCase()
     if (!['ppt', 'pptx', 'pdf'].includes(fileType || '')) {
       return NextResponse.json({ 
         success: false, 
@@ -20,18 +18,25 @@ export async function POST(request: Request) {
       }, { status: 400 })
     }
 
-    // Convert file to buffer
-    const buffer = await file.arrayBuffer()
+    // The backend indexes the deck for search under the user of this token
+    const headers: Record<string, string> = { 'Content-Type': 'application/octet-stream' }
+    const authorization = request.headers.get('authorization')
+    if (authorization) {
+      headers['Authorization'] = authorization
+    }
+
+    // Send the file as the raw body, streamed to disk by the backend as it arrives
+    const response = await fetch(
+      `http://localhost:8000/process-presentation/raw?filename=${encodeURIComponent(filename)}`,
+      {
+        method: 'POST',
+        headers,
+        body: request.body,
+        // Required by Node to send a stream as the request body
+        duplex: 'half'
+      } as RequestInit
+    )
 
-    // Get the file data as FormData
-    const uploadData = new FormData()
-    uploadData.append('file', file)    
-    // Send to backend for processing
-    const response = await fetch('http://localhost:8000/process-presentation', {
-      method: 'POST',
-      body: uploadData
-    })
-;
     if (!response.ok) {
       throw new Error('Failed to process presentation')
     }
@@ -42,10 +47,11 @@ export async function POST(request: Request) {
     const presentationId = Date.now().toString()
     const presentation = {
       id: presentationId,
-      title: file.name.replace(/\.(ppt|pptx|pdf)$/, ""),
+      title: filename.replace(/\.(ppt|pptx|pdf)$/, ""),
       slides: result.slides.map((slide: any) => ({
         number: slide.number,
         imagePath: slide.image_path,
+        images: slide.images,
         textContent: slide.text_content
       })),
       totalSlides: result.total_slides,
@@ -79,13 +79,10 @@ export default function Dashboard() {
     for (let i = 0; i < files.length; i++) {
       const file = files[i]
       if (file.name.endsWith(".ppt") || file.name.endsWith(".pptx")) {
-        const formData = new FormData();
-        formData.append('file', file);
-
         try {
-          const response = await fetch('/api/presentations/upload', {
+          const response = await fetch(`/api/presentations/upload?filename=${encodeURIComponent(file.name)}`, {
             method: 'POST',
-            body: formData,
+            body: file,
           });
 
           if (response.ok) {
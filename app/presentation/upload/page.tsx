@@ -72,12 +72,9 @@ export default function PresentationUpload() {
     setIsUploading(true)
 
     try {
-      const formData = new FormData()
-      formData.append("file", file)
-
-      const response = await fetch("/api/presentations/upload", {
+      const response = await fetch(`/api/presentations/upload?filename=${encodeURIComponent(file.name)}`, {
         method: "POST",
-        body: formData,
+        body: file,
       })
 
       const data = await response.json()
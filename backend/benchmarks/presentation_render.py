@@ -0,0 +1,114 @@
+import os
+import sys
+import time
+import asyncio
+import shutil
+import tempfile
+import fitz
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from services.presentation_service import PresentationService, render_pdf_pages
+from services.slide_cache import SlideCache
+
+SAMPLE_PDF = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "Hand_Gesture_Controlled_Presentation_Viewer_with_AI_Virtual_Board.pdf"
+)
+
+def render_png(path: str, output_dir: str, width: int):
+    """Render every page to one full-size PNG, as before variants; returns (seconds, bytes)"""
+    start = time.perf_counter()
+    total = 0
+    with fitz.open(path) as pdf_document:
+        for i in range(pdf_document.page_count):
+            page = pdf_document[i]
+            scale = width / page.rect.width
+            img_path = f"{output_dir}/slide_{i+1}.png"
+            page.get_pixmap(matrix=fitz.Matrix(scale, scale)).save(img_path)
+            page.get_text()
+            total += os.path.getsize(img_path)
+    return time.perf_counter() - start, total
+
+def render_sequential(path: str, output_dir: str, widths, quality: int):
+    """Render every variant of every page in this process; returns (seconds, slides)"""
+    start = time.perf_counter()
+    with fitz.open(path) as pdf_document:
+        pages = list(range(pdf_document.page_count))
+    slides = render_pdf_pages(path, pages, output_dir, widths, quality)
+    return time.perf_counter() - start, slides
+
+async def render_streaming(service: PresentationService, path: str, cached=False):
+    """Time to first slide and to the whole deck through the service; seconds"""
+    if not cached:
+        shutil.rmtree(service.cache.root, ignore_errors=True)
+        os.makedirs(service.cache.root)
+    # The service takes ownership of uploads, so hand it a copy
+    upload = os.path.join(service.upload_dir, os.path.basename(path))
+    shutil.copy(path, upload)
+    start = time.perf_counter()
+    first = None
+    _, _, slides = await service.stream_presentation(upload, os.path.basename(path))
+    async for _ in slides:
+        if first is None:
+            first = time.perf_counter() - start
+    return first, time.perf_counter() - start
+
+async def main(path: str, scales, repeat: int):
+    with fitz.open(path) as pdf_document:
+        page_count = pdf_document.page_count
+    print(f"{os.path.basename(path)}: {page_count} pages, {os.path.getsize(path) / 1024:.0f} KB, "
+          f"{settings.RENDER_WORKERS} workers, chunks of {settings.RENDER_CHUNK_PAGES}")
+
+    service = PresentationService()
+    with tempfile.TemporaryDirectory() as output_dir:
+        service.upload_dir = output_dir
+        service.cache = SlideCache(os.path.join(output_dir, "decks"), settings.SLIDE_CACHE_MAX_BYTES)
+
+        # Start the worker processes outside of the measurements
+        await render_streaming(service, path)
+
+        base_widths = dict(service.variant_widths)
+        print(f"{'scale':>6}{'png s':>9}{'variants s':>12}{'first slide s':>15}"
+              f"{'parallel s':>12}{'cached ms':>11}")
+        sizes = []
+        for scale in scales:
+            widths = {name: int(width * scale) for name, width in base_widths.items()}
+            service.variant_widths = widths
+            png, png_bytes = min(render_png(path, output_dir, max(widths.values())) for _ in range(repeat))
+            sequential, slides = min(
+                (render_sequential(path, output_dir, widths, service.webp_quality) for _ in range(repeat)),
+                key=lambda r: r[0]
+            )
+            runs = [await render_streaming(service, path) for _ in range(repeat)]
+            first = min(r[0] for r in runs)
+            total = min(r[1] for r in runs)
+            cached = min([(await render_streaming(service, path, cached=True))[1]
+                          for _ in range(repeat)])
+            print(f"{scale:>6}{png:>9.3f}{sequential:>12.3f}{first:>15.3f}{total:>12.3f}{1000 * cached:>11.2f}")
+
+            variant_bytes = {
+                name: sum(os.path.getsize(slide["images"][name]["path"]) for slide in slides)
+                for name in widths
+            }
+            sizes.append((scale, png_bytes, variant_bytes))
+
+        # What a client transfers for the whole deck at each size
+        names = list(base_widths)
+        print(f"\n{'scale':>6}{'png KB':>10}" + "".join(f"{name + ' KB':>12}" for name in names))
+        for scale, png_bytes, variant_bytes in sizes:
+            print(f"{scale:>6}{png_bytes / 1024:>10.0f}"
+                  + "".join(f"{variant_bytes[name] / 1024:>12.0f}" for name in names))
+
+    PresentationService.render_pool().shutdown()
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Benchmark PDF slide rendering")
+    parser.add_argument("--pdf", type=str, default=SAMPLE_PDF, help="PDF to render")
+    parser.add_argument("--scale", type=float, nargs="+", default=[0.5, 1.0],
+                        help="Multipliers applied to SLIDE_VARIANT_WIDTHS")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept)")
+
+    args = parser.parse_args()
+    asyncio.run(main(args.pdf, args.scale, args.repeat))
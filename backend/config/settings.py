@@ -1,22 +1,46 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import Dict, List
 
 class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
+    MONGODB_MAX_POOL_SIZE: int = 100
+    MONGODB_MIN_POOL_SIZE: int = 10  # kept warm so hot paths skip connection setup
+    MONGODB_MAX_IDLE_MS: int = 5 * 60 * 1000
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS: int = 5000
+    TRAINING_DATA_GRIDFS_BYTES: int = 8 * 1024 * 1024  # larger sessions are stored in GridFS
+    GESTURE_LOG_BATCH_SIZE: int = 500
+    GESTURE_LOG_FLUSH_SECONDS: float = 1.0
+    GESTURE_LOG_MAX_PENDING: int = 10000  # log_gesture waits beyond this
     
     # JWT Settings
     SECRET_KEY: str = "your-secret-key"
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    AUTH_CACHE_TTL_SECONDS: float = 60.0
+    AUTH_CACHE_MAX_ENTRIES: int = 10000
     
     # File Upload
     UPLOAD_DIR: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
+    MULTIPART_OVERHEAD: int = 64 * 1024  # Boundaries and part headers allowed on top of MAX_UPLOAD_SIZE
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024
     ALLOWED_EXTENSIONS: List[str] = ["ppt", "pptx", "pdf"]
+    SLIDE_VARIANT_WIDTHS: Dict[str, int] = {"thumb": 320, "screen": 1280, "2x": 2560}
+    SLIDE_WEBP_QUALITY: int = 80
+    RENDER_WORKERS: int = 4
+    RENDER_CHUNK_PAGES: int = 4
+    SLIDE_CACHE_DIR: str = ""  # defaults to UPLOAD_DIR/decks
+    SLIDE_CACHE_MAX_BYTES: int = 1024 * 1024 * 1024
+    SLIDE_PREFETCH_AHEAD: int = 2  # slides rendered ahead of the one requested
+    SEARCH_INDEX_PATH: str = ""  # defaults to UPLOAD_DIR/search_index.json
     
     # Model Settings
     MODEL_PATH: str = "models/gesture_model.pth"
+    GESTURE_MODEL_TYPE: str = "landmark"  # "landmark" or "cnn"
+    GESTURE_MODEL_FORMAT: str = "state_dict"  # "state_dict", "torchscript" or "int8"
+    GESTURE_MODEL_PATH: str = ""  # defaults to the pretrained file of the model type and format
+    USER_MODEL_CACHE_BYTES: int = 64 * 1024 * 1024
     GESTURE_CLASSES: List[str] = [
         "next_slide",
         "previous_slide",
@@ -37,11 +61,25 @@ class Settings(BaseSettings):
     # Gesture Recognition
     MIN_DETECTION_CONFIDENCE: float = 0.7
     MIN_TRACKING_CONFIDENCE: float = 0.7
+    TRACKER_WORKERS: int = 4
+    GESTURE_TARGET_FPS: float = 15.0
+    GESTURE_WINDOW_SIZE: int = 5
+    GESTURE_ENTER_RATIO: float = 0.6
+    GESTURE_EXIT_RATIO: float = 0.3
+    GESTURE_COOLDOWN_SECONDS: float = 0.75
+    INFERENCE_MAX_BATCH_SIZE: int = 16
+    INFERENCE_MAX_WAIT_MS: float = 5.0
     
     # Training
     BATCH_SIZE: int = 32
     LEARNING_RATE: float = 0.001
     NUM_EPOCHS: int = 50
+    TRAINING_WORKERS: int = 1
+    TRAINING_JOB_TTL_SECONDS: float = 3600.0  # finished jobs can be polled this long
+    TRAINING_JOB_MAX_FINISHED: int = 1000
+    BASE_LANDMARK_DATASET: str = ""  # landmark dataset of the base classes, replayed when training user heads
+    USER_HEAD_EPOCHS: int = 400
+    USER_HEAD_LEARNING_RATE: float = 0.05
     
     class Config:
         env_file = ".env"
@@ -1,29 +1,87 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorGridFSBucket
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+from collections import defaultdict
 from datetime import datetime, timedelta
-from typing import Dict, List, Any
+from typing import AsyncIterator, Dict, List, Any, Optional, Tuple
 import logging
+import numpy as np
+from config.settings import settings
+from database.write_buffer import WriteBehindBuffer
+from database.training_samples import (
+    LANDMARK_DTYPE, SCHEMA_VERSION, TIMESTAMP_DTYPE, decode_legacy, pack, unpack
+)
 
 logger = logging.getLogger(__name__)
 
+# Hourly rollups only cover the partial day at the start of a stats period
+HOURLY_ROLLUP_RETENTION = timedelta(days=35)
+# Marker in the maintenance collection while the rollups need a rebuild
+STALE_ROLLUPS_ID = "gesture_rollups_stale"
+
+def rollup_starts(timestamp: datetime) -> Tuple[datetime, datetime]:
+    """Start of the hour and of the day a timestamp falls in."""
+    hour = timestamp.replace(minute=0, second=0, microsecond=0)
+    return hour, hour.replace(hour=0)
+
 class MongoDB:
     def __init__(self, url: str):
-        self.client = AsyncIOMotorClient(url)
+        self.client = AsyncIOMotorClient(
+            url,
+            maxPoolSize=settings.MONGODB_MAX_POOL_SIZE,
+            minPoolSize=settings.MONGODB_MIN_POOL_SIZE,
+            maxIdleTimeMS=settings.MONGODB_MAX_IDLE_MS,
+            serverSelectionTimeoutMS=settings.MONGODB_SERVER_SELECTION_TIMEOUT_MS
+        )
         self.db = self.client.gesture_recognition
+        # Landmarks of training sessions too large for one document
+        self.training_files = AsyncIOMotorGridFSBucket(self.db, bucket_name="training_samples")
+        self.gesture_log_buffer = WriteBehindBuffer(
+            self._insert_gesture_logs,
+            max_batch_size=settings.GESTURE_LOG_BATCH_SIZE,
+            flush_interval=settings.GESTURE_LOG_FLUSH_SECONDS,
+            max_pending=settings.GESTURE_LOG_MAX_PENDING
+        )
         
+    async def get_user(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get a user by id, without credentials."""
+        try:
+            return await self.db.users.find_one(
+                {"_id": user_id},
+                {"password": 0, "hashed_password": 0}
+            )
+        except Exception as e:
+            logger.error(f"Error getting user: {e}")
+            raise
+
     async def save_training_data(
         self,
         user_id: str,
         gesture_name: str,
-        training_data: List[Dict[str, Any]]
+        landmarks: np.ndarray,
+        timestamps: np.ndarray
     ):
-        """Save gesture training data to database."""
+        """Save a training session as packed float32 landmarks; large ones go to GridFS."""
         try:
-            await self.db.training_data.insert_one({
+            doc = {
                 "user_id": user_id,
                 "gesture_name": gesture_name,
-                "data": training_data,
+                "schema_version": SCHEMA_VERSION,
+                "num_samples": len(landmarks),
+                "shape": list(landmarks.shape),
+                "timestamps": pack(timestamps, TIMESTAMP_DTYPE),
                 "created_at": datetime.utcnow()
-            })
+            }
+            packed = pack(landmarks, LANDMARK_DTYPE)
+            if len(packed) > settings.TRAINING_DATA_GRIDFS_BYTES:
+                doc["landmarks_file"] = await self.training_files.upload_from_stream(
+                    f"{user_id}/{gesture_name}",
+                    bytes(packed),
+                    metadata={"user_id": user_id, "gesture_name": gesture_name}
+                )
+            else:
+                doc["landmarks"] = packed
+            await self.db.training_data.insert_one(doc)
         except Exception as e:
             logger.error(f"Error saving training data: {e}")
             raise
@@ -34,17 +92,147 @@ class MongoDB:
         gesture: str,
         confidence: float
     ):
-        """Log detected gesture for analytics."""
+        """Log detected gesture for analytics; written in batches in the background."""
+        await self.gesture_log_buffer.add({
+            "user_id": user_id,
+            "gesture": gesture,
+            "confidence": confidence,
+            "timestamp": datetime.utcnow()
+        })
+
+    async def _insert_gesture_logs(self, documents: List[Dict[str, Any]]):
+        """Insert a batch of logs and add the inserted ones to the rollups.
+
+        When it is unknown which logs were written, or the rollup update
+        fails, the rollups are marked stale; repair_gesture_rollups then
+        rebuilds them from the logs.
+        """
         try:
-            await self.db.gesture_logs.insert_one({
-                "user_id": user_id,
-                "gesture": gesture,
-                "confidence": confidence,
-                "timestamp": datetime.utcnow()
-            })
-        except Exception as e:
-            logger.error(f"Error logging gesture: {e}")
+            await self.db.gesture_logs.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: every document without a write error was inserted
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            await self._roll_up([doc for i, doc in enumerate(documents) if i not in failed])
             raise
+        except Exception:
+            await self._mark_rollups_stale()
+            raise
+        await self._roll_up(documents)
+
+    async def _roll_up(self, documents: List[Dict[str, Any]]):
+        if not documents:
+            return
+        try:
+            await self._update_gesture_rollups(documents)
+        except Exception:
+            await self._mark_rollups_stale()
+            raise
+
+    async def _mark_rollups_stale(self):
+        try:
+            await self.db.maintenance.update_one(
+                {"_id": STALE_ROLLUPS_ID},
+                {"$set": {"since": datetime.utcnow()}},
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error marking gesture rollups stale, run database/rebuild_rollups.py: {e}")
+
+    async def _update_gesture_rollups(self, documents: List[Dict[str, Any]]):
+        """Add a batch of gesture logs to the hourly and daily rollups."""
+        totals = defaultdict(lambda: [0, 0.0])
+        for doc in documents:
+            hour, day = rollup_starts(doc["timestamp"])
+            for granularity, start in (("hour", hour), ("day", day)):
+                total = totals[(doc["user_id"], doc["gesture"], granularity, start)]
+                total[0] += 1
+                total[1] += doc["confidence"]
+
+        updates = []
+        for (user_id, gesture, granularity, start), (count, confidence_sum) in totals.items():
+            update = {"$inc": {"count": count, "confidence_sum": confidence_sum}}
+            if granularity == "hour":
+                update["$setOnInsert"] = {"expires_at": start + HOURLY_ROLLUP_RETENTION}
+            updates.append(UpdateOne(
+                {"user_id": user_id, "granularity": granularity, "start": start, "gesture": gesture},
+                update,
+                upsert=True
+            ))
+        await self.db.gesture_rollups.bulk_write(updates, ordered=False)
+
+    async def ensure_indexes(self):
+        """Create the indexes queries rely on; a no-op when they exist."""
+        await self.db.gesture_rollups.create_index(
+            [("user_id", ASCENDING), ("granularity", ASCENDING), ("start", ASCENDING), ("gesture", ASCENDING)],
+            unique=True
+        )
+        # Hourly rollups expire; daily ones have no expires_at and are kept
+        await self.db.gesture_rollups.create_index("expires_at", expireAfterSeconds=0)
+        await self.db.gesture_logs.create_index([("user_id", ASCENDING), ("timestamp", DESCENDING)])
+        await self.db.training_data.create_index([("user_id", ASCENDING), ("gesture_name", ASCENDING)])
+
+    async def repair_gesture_rollups(self) -> bool:
+        """Rebuild the rollups if a failed write marked them stale; returns whether it did."""
+        if await self.db.maintenance.find_one({"_id": STALE_ROLLUPS_ID}) is None:
+            return False
+        await self.rebuild_gesture_rollups()
+        return True
+
+    async def rebuild_gesture_rollups(self):
+        """Recompute all rollups from the raw logs, e.g. for logs written before rollups existed.
+
+        Logs written while the rebuild runs may be counted twice or not at
+        all, so run it while no server is writing logs.
+        """
+        marker = await self.db.maintenance.find_one({"_id": STALE_ROLLUPS_ID})
+        await self.db.gesture_rollups.delete_many({})
+        for granularity, unit in (("hour", "hour"), ("day", "day")):
+            pipeline = [
+                {
+                    "$group": {
+                        "_id": {
+                            "user_id": "$user_id",
+                            "gesture": "$gesture",
+                            "start": {"$dateTrunc": {"date": "$timestamp", "unit": unit}}
+                        },
+                        "count": {"$sum": 1},
+                        "confidence_sum": {"$sum": "$confidence"}
+                    }
+                },
+                {
+                    "$project": {
+                        "_id": 0,
+                        "user_id": "$_id.user_id",
+                        "gesture": "$_id.gesture",
+                        "granularity": granularity,
+                        "start": "$_id.start",
+                        "count": 1,
+                        "confidence_sum": 1
+                    }
+                }
+            ]
+            if granularity == "hour":
+                pipeline.append({
+                    "$set": {
+                        "expires_at": {
+                            "$dateAdd": {
+                                "startDate": "$start",
+                                "unit": "day",
+                                "amount": HOURLY_ROLLUP_RETENTION.days
+                            }
+                        }
+                    }
+                })
+            pipeline.append({
+                "$merge": {
+                    "into": "gesture_rollups",
+                    "on": ["user_id", "granularity", "start", "gesture"]
+                }
+            })
+            await self.db.gesture_logs.aggregate(pipeline).to_list(length=None)
+        if marker is not None:
+            # Unless a write failed again during the rebuild
+            await self.db.maintenance.delete_one({"_id": STALE_ROLLUPS_ID, "since": marker["since"]})
             
     async def get_gesture_stats(
         self,
@@ -64,24 +252,31 @@ class MongoDB:
             else:
                 raise ValueError("Invalid period")
                 
-            # Get gesture counts
+            # Read the rollups: hours up to the first full day, whole days after it.
+            # The period starts at the beginning of its first hour.
+            first_hour, first_day = rollup_starts(start_date)
+            if first_day < first_hour:
+                first_day += timedelta(days=1)
             pipeline = [
                 {
                     "$match": {
                         "user_id": user_id,
-                        "timestamp": {"$gte": start_date}
+                        "$or": [
+                            {"granularity": "hour", "start": {"$gte": first_hour, "$lt": first_day}},
+                            {"granularity": "day", "start": {"$gte": first_day}}
+                        ]
                     }
                 },
                 {
                     "$group": {
                         "_id": "$gesture",
-                        "count": {"$sum": 1},
-                        "avg_confidence": {"$avg": "$confidence"}
+                        "count": {"$sum": "$count"},
+                        "confidence_sum": {"$sum": "$confidence_sum"}
                     }
                 }
             ]
             
-            cursor = self.db.gesture_logs.aggregate(pipeline)
+            cursor = self.db.gesture_rollups.aggregate(pipeline)
             results = await cursor.to_list(length=None)
             
             # Format results
@@ -89,8 +284,8 @@ class MongoDB:
                 "period": period,
                 "total_gestures": sum(r["count"] for r in results),
                 "gesture_counts": {r["_id"]: r["count"] for r in results},
-                "recognition_rates": {r["_id"]: r["avg_confidence"] for r in results},
-                "start_date": start_date.isoformat(),
+                "recognition_rates": {r["_id"]: r["confidence_sum"] / r["count"] for r in results},
+                "start_date": first_hour.isoformat(),
                 "end_date": now.isoformat()
             }
             
@@ -100,15 +295,77 @@ class MongoDB:
             logger.error(f"Error getting gesture stats: {e}")
             raise
             
+    async def close(self):
+        """Flush buffered writes and close the connection."""
+        await self.gesture_log_buffer.close()
+        self.client.close()
+
     async def get_user_training_data(
         self,
         user_id: str
     ) -> List[Dict[str, Any]]:
         """Get all training data for a user."""
         try:
-            cursor = self.db.training_data.find({"user_id": user_id})
-            return await cursor.to_list(length=None)
+            return [session async for session in self.iter_training_data(user_id)]
         except Exception as e:
             logger.error(f"Error getting training data: {e}")
             raise
 
+    async def iter_training_data(
+        self,
+        user_id: str,
+        gesture_name: Optional[str] = None,
+        batch_size: int = 16
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Stream a user's training sessions, oldest first, with landmarks and timestamps as arrays.
+
+        Sessions are fetched batch_size documents at a time and their
+        arrays point into the stored bytes instead of copying them.
+        """
+        query = {"user_id": user_id}
+        if gesture_name is not None:
+            query["gesture_name"] = gesture_name
+        cursor = self.db.training_data.find(query).sort("created_at", ASCENDING).batch_size(batch_size)
+        async for doc in cursor:
+            landmarks, timestamps = await self._decode_training_session(doc)
+            yield {
+                "_id": doc["_id"],
+                "gesture_name": doc["gesture_name"],
+                "created_at": doc["created_at"],
+                "landmarks": landmarks,
+                "timestamps": timestamps
+            }
+
+    async def _decode_training_session(self, doc: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+        if doc.get("schema_version", 1) == 1:
+            return decode_legacy(doc)
+        if "landmarks_file" in doc:
+            stream = await self.training_files.open_download_stream(doc["landmarks_file"])
+            data = await stream.read()
+        else:
+            data = doc["landmarks"]
+        landmarks = unpack(data, LANDMARK_DTYPE, doc["shape"])
+        timestamps = unpack(doc["timestamps"], TIMESTAMP_DTYPE, [doc["num_samples"]])
+        return landmarks, timestamps
+
+
+
+# Client shared by the whole application, created by the FastAPI lifespan
+_database: Optional[MongoDB] = None
+
+def connect_database(url: str) -> MongoDB:
+    global _database
+    if _database is None:
+        _database = MongoDB(url)
+    return _database
+
+def get_database() -> MongoDB:
+    if _database is None:
+        raise RuntimeError("Database is not connected")
+    return _database
+
+async def close_database():
+    global _database
+    if _database is not None:
+        await _database.close()
+        _database = None
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import settings
+from database.mongodb import MongoDB
+
+async def rebuild(force=False):
+    """Rebuild the gesture rollups if they are marked stale, or always with force"""
+    database = MongoDB(settings.MONGODB_URL)
+    try:
+        if force:
+            await database.rebuild_gesture_rollups()
+        elif not await database.repair_gesture_rollups():
+            print('Gesture rollups are up to date')
+            return
+        print('Rebuilt gesture rollups from the logs')
+    finally:
+        await database.close()
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Recompute gesture stats rollups from the raw gesture logs')
+    parser.add_argument('--force', action='store_true',
+                        help='Rebuild even when the rollups are not marked stale')
+
+    args = parser.parse_args()
+    # Logs written by a running server during the rebuild may be miscounted
+    asyncio.run(rebuild(args.force))
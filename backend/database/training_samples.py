@@ -0,0 +1,41 @@
+import numpy as np
+from bson.binary import Binary
+from typing import Any, Dict, List, Tuple
+
+# 1: nested lists of landmark dicts under "data" (unversioned documents)
+# 2: packed little-endian float32 landmarks and float64 timestamps
+SCHEMA_VERSION = 2
+
+LANDMARK_DTYPE = np.dtype("<f4")
+TIMESTAMP_DTYPE = np.dtype("<f8")
+
+
+def samples_to_arrays(training_data: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """(N, 21, 3) float32 landmarks and N float64 timestamps of raw client samples.
+
+    Landmarks may be {"x", "y", "z"} dicts or [x, y, z] lists.
+    """
+    if not training_data:
+        raise ValueError("No training samples")
+    landmarks = np.array([
+        [[p["x"], p["y"], p["z"]] if isinstance(p, dict) else p for p in sample["landmarks"]]
+        for sample in training_data
+    ], dtype=LANDMARK_DTYPE)
+    timestamps = np.array([sample.get("timestamp", 0.0) for sample in training_data], dtype=TIMESTAMP_DTYPE)
+    return landmarks.reshape(len(training_data), -1, 3), timestamps
+
+
+def pack(array: np.ndarray, dtype: np.dtype) -> Binary:
+    return Binary(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+
+def unpack(data: bytes, dtype: np.dtype, shape: List[int]) -> np.ndarray:
+    """Read-only array over the stored bytes, without copying them."""
+    return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+def decode_legacy(doc: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray]:
+    """Arrays of a version 1 document."""
+    if not doc.get("data"):
+        return np.zeros((0, 21, 3), dtype=LANDMARK_DTYPE), np.zeros(0, dtype=TIMESTAMP_DTYPE)
+    return samples_to_arrays(doc["data"])
@@ -0,0 +1,122 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    """Collects documents and writes them in batches in the background.
+
+    A batch is written once max_batch_size documents are waiting or
+    flush_interval seconds passed since the last write. When the database
+    falls behind and max_pending documents are waiting, add() blocks
+    until a write made room. Failed batches are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], Awaitable[Any]],
+        max_batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_pending: int = 10000,
+        history_size: int = 100
+    ):
+        self.write_batch = write_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_interval
+        self.max_pending = max(self.max_batch_size, max_pending)
+        self._pending: List[Dict[str, Any]] = []
+        self._full: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Condition] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+
+        # Metrics
+        self.batches = 0
+        self.written = 0
+        self.dropped = 0
+        self.blocked = 0
+        self.total_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+        self.recent = deque(maxlen=history_size)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._full = asyncio.Event()
+            self._space = asyncio.Condition()
+            self._task = asyncio.create_task(self._run())
+
+    async def add(self, document: Dict[str, Any]):
+        """Queue a document; waits while the buffer is full."""
+        if self._closing:
+            raise RuntimeError("Write buffer is closed")
+        self._ensure_started()
+        async with self._space:
+            if len(self._pending) >= self.max_pending:
+                self.blocked += 1
+                await self._space.wait_for(lambda: len(self._pending) < self.max_pending)
+            self._pending.append(document)
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+
+    async def _run(self):
+        while not (self._closing and not self._pending):
+            if len(self._pending) < self.max_batch_size and not self._closing:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._full.clear()
+            await self._flush()
+
+    async def _flush(self):
+        while self._pending:
+            async with self._space:
+                batch = self._pending[:self.max_batch_size]
+                del self._pending[:self.max_batch_size]
+                self._space.notify_all()
+
+            started = time.monotonic()
+            try:
+                await self.write_batch(batch)
+                self.written += len(batch)
+            except Exception as e:
+                logger.error(f"Error writing batch of {len(batch)} documents: {e}")
+                self.dropped += len(batch)
+            flush_ms = (time.monotonic() - started) * 1000
+
+            self.batches += 1
+            self.total_flush_ms += flush_ms
+            self.max_flush_ms = max(self.max_flush_ms, flush_ms)
+            self.recent.append({"size": len(batch), "flush_ms": round(flush_ms, 2)})
+
+            # Only drain everything at once when closing or already a full batch behind
+            if not self._closing and len(self._pending) < self.max_batch_size:
+                break
+
+    def stats(self) -> Dict[str, Any]:
+        batches = max(self.batches, 1)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "flush_interval": self.flush_interval,
+            "max_pending": self.max_pending,
+            "depth": len(self._pending),
+            "batches": self.batches,
+            "written": self.written,
+            "dropped": self.dropped,
+            "blocked": self.blocked,
+            "avg_batch_size": (self.written + self.dropped) / batches,
+            "avg_flush_ms": self.total_flush_ms / batches,
+            "max_flush_ms": self.max_flush_ms,
+            "recent_flushes": list(self.recent)
+        }
+
+    async def close(self):
+        """Write everything still buffered and stop the background task."""
+        self._closing = True
+        if self._task is not None:
+            self._full.set()
+            await self._task
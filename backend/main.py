@@ -1,14 +1,54 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Dict, Tuple
+from fastapi.responses import FileResponse, StreamingResponse
+from pydantic import BaseModel
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import json
+import os
+import time
 import cv2
 import numpy as np
 import mediapipe as mp
-import math
 import torch
+from config.settings import settings
+from services.hand_tracker_pool import HandTrackerPool
+from services.frame_slot import LatestFrameSlot
+from services.inference_batcher import InferenceBatcher
+from services.gesture_debouncer import GestureDebouncer
+from services.model_registry import UserHead, UserModelRegistry
+from services.gesture_training_service import GestureTrainingService
+from services.presentation_service import PresentationService
+from database.mongodb import close_database, connect_database, get_database
+from models.gesture_model import GESTURE_MAP, load_gesture_model
+from utils.gesture_rules import RULE_GESTURES, as_points, classify, classify_batch
+from utils.preprocessing import normalize_landmarks
+from utils.uploads import UploadSizeLimit, UploadTooLarge, read_chunks, save_stream
+from utils.authentication import authenticate_token, get_current_user, get_optional_user, user_cache
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # One client and connection pool for every request and service
+    database = connect_database(settings.MONGODB_URL)
+    try:
+        await database.ensure_indexes()
+    except Exception as e:
+        print(f"Error creating database indexes: {e}")
+    try:
+        # Before serving, so no logs are written during a rebuild
+        if await database.repair_gesture_rollups():
+            print("Rebuilt stale gesture rollups")
+    except Exception as e:
+        print(f"Error repairing gesture rollups: {e}")
+    yield
+    await close_database()
+    await inference_batcher.close()
+    tracker_pool.shutdown()
+    training_service.shutdown()
 
 # Initialize FastAPI app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware configuration
 app.add_middleware(
@@ -19,26 +59,28 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize MediaPipe hands
-mp_hands = mp.solutions.hands
-hands = mp_hands.Hands(
-    static_image_mode=False,
-    max_num_hands=1,
-    min_detection_confidence=0.7,
-    min_tracking_confidence=0.7
+# Reject oversized uploads while they arrive; multipart ones are otherwise spooled in full first
+app.add_middleware(
+    UploadSizeLimit,
+    paths=["/process-presentation", "/process-presentation/raw", "/process-presentation/stream"],
+    max_bytes=settings.MAX_UPLOAD_SIZE + settings.MULTIPART_OVERHEAD
 )
 
-# Constants for gesture recognition
-FINGER_INDICES = {
-    'THUMB': [1, 2, 3, 4],
-    'INDEX': [5, 6, 7, 8],
-    'MIDDLE': [9, 10, 11, 12],
-    'RING': [13, 14, 15, 16],
-    'PINKY': [17, 18, 19, 20]
-}
+# MediaPipe hands, one tracker per connected client
+mp_hands = mp.solutions.hands
+
+def create_hands():
+    return mp_hands.Hands(
+        static_image_mode=False,
+        max_num_hands=1,
+        min_detection_confidence=settings.MIN_DETECTION_CONFIDENCE,
+        min_tracking_confidence=settings.MIN_TRACKING_CONFIDENCE
+    )
 
+tracker_pool = HandTrackerPool(settings.TRACKER_WORKERS, create_hands)
+
+# Constants for gesture recognition
 CONFIDENCE_THRESHOLD = 0.7
-DISTANCE_THRESHOLD = 0.1
 
 class GestureProcessor:
     def __init__(self):
@@ -47,10 +89,14 @@ class GestureProcessor:
         self.load_model()
         
     def load_model(self):
+        self.model_type = settings.GESTURE_MODEL_TYPE
         try:
-            self.model = GestureRecognitionModel(num_classes=10)
-            self.model.load_state_dict(torch.load('pretrained_gesture_model.pth'))
-            self.model.eval()
+            self.model = load_gesture_model(
+                settings.GESTURE_MODEL_PATH or None,
+                model_type=self.model_type,
+                num_classes=len(GESTURE_MAP),
+                model_format=settings.GESTURE_MODEL_FORMAT
+            )
         except Exception as e:
             print(f"Error loading model: {e}")
             print("Falling back to rule-based gesture recognition")
@@ -61,104 +107,111 @@ class GestureProcessor:
         frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         frame = frame.transpose((2, 0, 1)) / 255.0
         return torch.FloatTensor(frame).unsqueeze(0)
+
+    def preprocess_landmarks(self, points: np.ndarray) -> torch.Tensor:
+        # Same normalization the landmark model was trained with
+        return torch.from_numpy(normalize_landmarks(points).astype(np.float32)).unsqueeze(0)
+
+    def model_input(self, points: np.ndarray, frame=None) -> Optional[torch.Tensor]:
+        """Model input for a hand, or None when no model can score it."""
+        if self.model is None:
+            return None
+        if self.model_type == "landmark":
+            return self.preprocess_landmarks(points)
+        if frame is not None:
+            return self.preprocess_frame(frame)
+        return None
+
+    @property
+    def supports_user_heads(self) -> bool:
+        """Whether personalized heads can run on this model's features."""
+        return (
+            self.model is not None and self.model_type == "landmark"
+            and hasattr(self.model, "features") and hasattr(self.model, "classifier")
+        )
+
+    def run_model_batch(self, items: List[Tuple[torch.Tensor, Optional[UserHead]]]) -> List[Tuple[str, float]]:
+        """Run the model once over (preprocessed (1, ...) input, user head) pairs.
+
+        The shared feature layers see the whole batch; rows are then grouped
+        by user head, with None meaning the base model's own classifier.
+        """
+        inputs = torch.cat([model_input for model_input, _ in items])
+        heads = [head for _, head in items]
+        results = [None] * len(items)
+
+        with torch.no_grad():
+            if all(head is None for head in heads):
+                groups = {None: (self.model(inputs), list(range(len(items))))}
+            else:
+                features = self.model.features(torch.flatten(inputs, 1))
+                rows_by_head = {}
+                for row, head in enumerate(heads):
+                    rows_by_head.setdefault(head, []).append(row)
+                groups = {
+                    head: ((head.module if head is not None else self.model.classifier)(features[rows]), rows)
+                    for head, rows in rows_by_head.items()
+                }
+
+            for head, (output, rows) in groups.items():
+                classes = head.classes if head is not None else GESTURE_MAP
+                confidence, predicted = torch.max(torch.softmax(output, 1), 1)
+                for row, idx, conf in zip(rows, predicted.tolist(), confidence.tolist()):
+                    results[row] = (classes[idx], conf)
+        return results
     
-    def recognize_gesture(self, landmarks: list, frame=None) -> Tuple[str, float, dict]:
-        if not landmarks:
+    def recognize_gesture(self, landmarks, frame=None) -> Tuple[str, float, dict]:
+        """Recognize one hand given as a (21, 3) array or 21 landmark objects."""
+        if landmarks is None or len(landmarks) == 0:
             return "no_gesture", 0.0, {}
             
+        points = as_points(landmarks)
+
         # Try model-based recognition first
-        if self.model is not None and frame is not None:
-            try:
-                input_tensor = self.preprocess_frame(frame)
-                with torch.no_grad():
-                    output = self.model(input_tensor)
-                    confidence, predicted = torch.max(output, 1)
-                    gesture_idx = predicted.item()
-                    gesture_map = {
-                        0: "point_right",  # Next slide
-                        1: "point_left",   # Previous slide
-                        2: "pointer",      # Display pointer
-                        3: "palm_out",     # Erase drawing
-                        4: "stop",         # Stop presentation
-                        5: "open_hand",    # First slide
-                        6: "peace",        # Last slide
-                        7: "draw",         # Draw on screen
-                        8: "save",         # Save slide/drawing
-                        9: "highlight"     # Highlight text
-                    }
-                    return gesture_map[gesture_idx], confidence.item(), {}
-            except Exception as e:
-                print(f"Model inference error: {e}")
+        try:
+            model_input = self.model_input(points, frame)
+            if model_input is not None:
+                gesture, confidence = self.run_model_batch([(model_input, None)])[0]
+                return gesture, confidence, {}
+        except Exception as e:
+            print(f"Model inference error: {e}")
                 
         # Fallback to rule-based recognition
-        normalized_landmarks = self.normalize_landmarks(landmarks)
-        thumb_extended = self.is_finger_extended(normalized_landmarks, FINGER_INDICES['THUMB'])
-        index_extended = self.is_finger_extended(normalized_landmarks, FINGER_INDICES['INDEX'])
-        middle_extended = self.is_finger_extended(normalized_landmarks, FINGER_INDICES['MIDDLE'])
-        ring_extended = self.is_finger_extended(normalized_landmarks, FINGER_INDICES['RING'])
-        pinky_extended = self.is_finger_extended(normalized_landmarks, FINGER_INDICES['PINKY'])
-        
-        dx, dy = self.get_palm_direction(landmarks)
-        palm_facing_up = dy < -DISTANCE_THRESHOLD
-        
-        # Basic gesture detection logic
-        if index_extended and not (thumb_extended or middle_extended or ring_extended or pinky_extended):
-            return "point_right", 0.95, {}
-            
-        if pinky_extended and not (thumb_extended or index_extended or middle_extended or ring_extended):
-            return "point_left", 0.95, {}
-            
-        if index_extended and middle_extended and not (thumb_extended or ring_extended or pinky_extended):
-            return "draw", 0.9, {}
-            
-        if all([thumb_extended, index_extended, middle_extended, ring_extended, pinky_extended]):
-            return "open_hand", 0.95, {}
-            
-        if not any([thumb_extended, index_extended, middle_extended, ring_extended, pinky_extended]):
-            return "stop", 0.95, {}
-            
-        self.prev_landmarks = landmarks
-        return "no_gesture", 0.0, {}
-
-    def is_finger_extended(self, landmarks: list, finger_indices: list) -> bool:
-        finger_tip = landmarks[finger_indices[-1]]
-        finger_base = landmarks[finger_indices[0]]
-        return finger_tip.y < finger_base.y - DISTANCE_THRESHOLD
-
-    def get_palm_direction(self, landmarks: list) -> Tuple[float, float]:
-        wrist = landmarks[0]
-        middle_base = landmarks[9]
-        return (middle_base.x - wrist.x, middle_base.y - wrist.y)
-
-    def calculate_finger_angle(self, landmarks: list, finger_indices: list) -> float:
-        base = landmarks[finger_indices[0]]
-        tip = landmarks[finger_indices[-1]]
-        return math.atan2(tip.y - base.y, tip.x - base.x)
-
-    def normalize_landmarks(self, landmarks: list) -> list:
-        # Convert to numpy array for easier processing
-        points = np.array([[lm.x, lm.y, lm.z] for lm in landmarks])
-        
-        # Normalize by the wrist position
-        wrist = points[0]
-        points = points - wrist
-        
-        # Scale to a consistent range
-        max_dist = np.max(np.linalg.norm(points, axis=1))
-        if max_dist > 0:
-            points = points / max_dist
-            
-        return [type('Landmark', (), {'x': p[0], 'y': p[1], 'z': p[2]}) for p in points]
+        return self.recognize_rules(points)
+
+    def recognize_rules(self, points: np.ndarray) -> Tuple[str, float, dict]:
+        """Rule-based recognition of one (21, 3) hand."""
+        gesture_idx, confidence = classify(points)
+        gesture = RULE_GESTURES[gesture_idx]
+        if gesture == "no_gesture":
+            self.prev_landmarks = points
+        return gesture, float(confidence), {}
 
-    def calculate_finger_distance(self, landmarks: list, finger1: list, finger2: list) -> float:
-        tip1 = landmarks[finger1[-1]]
-        curr_angle = math.atan2(curr_landmarks[12].y - curr_landmarks[0].y,
-                               curr_landmarks[12].x - curr_landmarks[0].x)
-        return curr_angle - prev_angle
+    def recognize_batch(self, landmarks) -> Tuple[List[str], np.ndarray]:
+        """Rule-based recognition of an (N, 21, 3) batch of hands."""
+        return classify_batch(landmarks)
 
 # Initialize gesture processor
 gesture_processor = GestureProcessor()
 
+# Personalized heads of custom-trained users, loaded when they connect
+model_registry = UserModelRegistry(settings.USER_MODEL_CACHE_BYTES)
+
+# Custom gestures train in background processes; a finished job drops the
+# user's cached head so the next connection loads the new one
+training_service = GestureTrainingService(
+    on_trained=lambda job: model_registry.invalidate(job["user_id"])
+)
+
+presentation_service = PresentationService()
+
+# Model forward passes of all clients are grouped into micro-batches
+inference_batcher = InferenceBatcher(
+    gesture_processor.run_model_batch,
+    max_batch_size=settings.INFERENCE_MAX_BATCH_SIZE,
+    max_wait_ms=settings.INFERENCE_MAX_WAIT_MS
+)
+
 # WebSocket connection manager
 class ConnectionManager:
     def __init__(self):
@@ -182,36 +235,336 @@ class ConnectionManager:
 
 manager = ConnectionManager()
 
-@app.websocket("/ws/gestures/{client_id}")
-async def websocket_endpoint(websocket: WebSocket, client_id: str):
-    await manager.connect(websocket, client_id)
+# Landmark-only protocol: 21 (x, y, z) little-endian float32 values per
+# message, an empty message meaning no hand is in view
+LANDMARK_PACKET_DTYPE = np.dtype('<f4')
+LANDMARK_PACKET_SIZE = 21 * 3 * LANDMARK_PACKET_DTYPE.itemsize
+
+def process_frame(hands, data: bytes) -> Optional[Tuple[np.ndarray, Optional[torch.Tensor]]]:
+    """Decode and track a frame; runs on a tracker worker.
+
+    Returns the hand landmarks and, when a model is loaded, the
+    preprocessed model input, or None if no hand was found.
+    """
+    frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    if frame is None:
+        return None
+    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    results = hands.process(frame_rgb)
+
+    if not results.multi_hand_landmarks:
+        return None
+
+    # Extract landmarks
+    hand_landmarks = np.array(
+        [[lm.x, lm.y, lm.z] for lm in results.multi_hand_landmarks[0].landmark],
+        dtype=np.float32
+    )
+    return hand_landmarks, gesture_processor.model_input(hand_landmarks, frame)
+
+async def recognize(
+    points: np.ndarray,
+    model_input: Optional[torch.Tensor] = None,
+    user_head: Optional[UserHead] = None
+) -> Tuple[str, float, dict]:
+    """Recognize a gesture, batching model inference across clients."""
+    if model_input is not None:
+        try:
+            gesture, confidence = await inference_batcher.submit((model_input, user_head))
+            return gesture, confidence, {}
+        except Exception as e:
+            print(f"Model inference error: {e}")
+    return gesture_processor.recognize_rules(points)
+
+def parse_landmark_packet(data: bytes) -> Optional[np.ndarray]:
+    """Decode a client-side landmark packet into a (21, 3) array."""
+    if not data:
+        return None
+    if len(data) != LANDMARK_PACKET_SIZE:
+        raise ValueError(
+            f"Landmark packet must be {LANDMARK_PACKET_SIZE} bytes, got {len(data)}"
+        )
+    return np.frombuffer(data, LANDMARK_PACKET_DTYPE).reshape(21, 3)
+
+async def load_user_head(user_id: Optional[str]) -> Optional[UserHead]:
+    if not user_id or not gesture_processor.supports_user_heads:
+        return None
+    return await model_registry.acquire(user_id)
+
+async def receive_frames(websocket: WebSocket, slot: LatestFrameSlot):
+    """Read frames as fast as they arrive, keeping only the newest one; text messages are skipped."""
     try:
         while True:
-            data = await websocket.receive_bytes()
-            frame = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results = hands.process(frame_rgb)
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            if message.get("bytes") is None:
+                print("Skipping text message, frames are sent as binary messages")
+                continue
+            slot.put(message["bytes"])
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error receiving frames: {e}")
+    finally:
+        slot.close()
 
-            if not results.multi_hand_landmarks:
-                await manager.send_gesture(client_id, "no_gesture", 0.0)
+async def run_gesture_session(
+    websocket: WebSocket,
+    client_id: str,
+    process: Callable[[bytes], Awaitable[Optional[Tuple[str, float, dict]]]],
+    user_id: Optional[str] = None
+):
+    """Recognize gestures from the newest message of a client until it disconnects."""
+    slot = LatestFrameSlot()
+    receiver = asyncio.create_task(receive_frames(websocket, slot))
+    debouncer = GestureDebouncer(
+        window_size=settings.GESTURE_WINDOW_SIZE,
+        enter_ratio=settings.GESTURE_ENTER_RATIO,
+        exit_ratio=settings.GESTURE_EXIT_RATIO,
+        cooldown=settings.GESTURE_COOLDOWN_SECONDS,
+        min_confidence=CONFIDENCE_THRESHOLD
+    )
+    frame_interval = 1.0 / settings.GESTURE_TARGET_FPS if settings.GESTURE_TARGET_FPS > 0 else 0.0
+    try:
+        while True:
+            item = await slot.get()
+            if item is None:
+                break
+            data, received_at = item
+            started = time.monotonic()
+            try:
+                result = await process(data)
+            except ValueError as e:
+                # A malformed message must not end the session
+                print(f"Skipping malformed message from {client_id}: {e}")
                 continue
+            slot.processed += 1
 
-            # Extract landmarks
-            hand_landmarks = [
-                type('Landmark', (), {'x': lm.x, 'y': lm.y, 'z': lm.z})
-                for lm in results.multi_hand_landmarks[0].landmark
-            ]
-            gesture, confidence, metadata = gesture_processor.recognize_gesture(hand_landmarks)
-            
-            # Only send gestures with confidence above threshold
-            if confidence >= CONFIDENCE_THRESHOLD:
-                await manager.send_gesture(client_id, gesture, confidence, metadata)
+            stats = slot.stats()
+            stats["latency_ms"] = round((time.monotonic() - received_at) * 1000, 1)
+
+            gesture, confidence, metadata = result if result is not None else ("no_gesture", 0.0, {})
+
+            # Only send when a gesture starts or ends, not for every frame
+            event = debouncer.update(gesture, confidence)
+            if event is not None:
+                gesture, confidence = event
+                await manager.send_gesture(client_id, gesture, confidence, {**metadata, **stats})
+                if user_id is not None and gesture != "no_gesture":
+                    await get_database().log_gesture(user_id, gesture, confidence)
+
+            # Pace processing to the target FPS; frames arriving meanwhile
+            # overwrite each other and only the newest one is processed
+            elapsed = time.monotonic() - started
+            if elapsed < frame_interval:
+                await asyncio.sleep(frame_interval - elapsed)
+    finally:
+        receiver.cancel()
 
+async def authorize_session(websocket: WebSocket, user_id: Optional[str], token: Optional[str]) -> Tuple[bool, Optional[str]]:
+    """(allowed, user id) of a socket; the user comes from the token, sockets without one are anonymous.
+
+    user_id is only accepted alongside a token, which decides the user;
+    a bare user_id would let any client log gestures as another user.
+    """
+    if token is None:
+        if user_id is not None:
+            await websocket.close(code=1008)
+            return False, None
+        return True, None
+    user = await authenticate_token(token)
+    if user is None:
+        await websocket.close(code=1008)
+        return False, None
+    return True, str(user["_id"])
+
+@app.websocket("/ws/gestures/{client_id}")
+async def websocket_endpoint(
+    websocket: WebSocket,
+    client_id: str,
+    user_id: Optional[str] = None,
+    token: Optional[str] = None
+):
+    allowed, user_id = await authorize_session(websocket, user_id, token)
+    if not allowed:
+        return
+    await manager.connect(websocket, client_id)
+    tracker_pool.assign(client_id)
+    user_head = await load_user_head(user_id)
+
+    async def process(data: bytes):
+        tracked = await tracker_pool.submit(client_id, process_frame, data)
+        if tracked is None:
+            return None
+        points, model_input = tracked
+        return await recognize(points, model_input, user_head)
+
+    try:
+        await run_gesture_session(websocket, client_id, process, user_id)
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        pass
     except Exception as e:
         print(f"Error processing frame: {str(e)}")
+    finally:
         manager.disconnect(client_id)
+        await tracker_pool.release(client_id)
+
+@app.websocket("/ws/landmarks/{client_id}")
+async def landmark_websocket_endpoint(
+    websocket: WebSocket,
+    client_id: str,
+    user_id: Optional[str] = None,
+    token: Optional[str] = None
+):
+    """Same as /ws/gestures but clients send hand landmarks instead of frames."""
+    allowed, user_id = await authorize_session(websocket, user_id, token)
+    if not allowed:
+        return
+    await manager.connect(websocket, client_id)
+    user_head = await load_user_head(user_id)
+
+    async def process(data: bytes):
+        points = parse_landmark_packet(data)
+        if points is None:
+            return None
+        return await recognize(points, gesture_processor.model_input(points), user_head)
+
+    try:
+        await run_gesture_session(websocket, client_id, process, user_id)
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        print(f"Error processing landmarks: {str(e)}")
+    finally:
+        manager.disconnect(client_id)
+
+class TrainGestureRequest(BaseModel):
+    gesture_name: str
+    training_data: List[Dict[str, Any]]
+
+@app.post("/api/gestures/train")
+async def train_gesture(request: TrainGestureRequest, user: Dict = Depends(get_current_user)):
+    return await training_service.train_user_gesture(
+        str(user["_id"]),
+        request.gesture_name,
+        request.training_data
+    )
+
+@app.get("/api/gestures/train/{job_id}")
+async def get_training_job(job_id: str, user: Dict = Depends(get_current_user)):
+    job = training_service.get_training_job(job_id)
+    # Other users' jobs look the same as missing ones
+    if job is None or job["user_id"] != str(user["_id"]):
+        raise HTTPException(status_code=404, detail="Training job not found")
+    return job
+
+@app.get("/api/gestures/stats")
+async def gesture_stats(period: str = "week", user: Dict = Depends(get_current_user)):
+    try:
+        return await get_database().get_gesture_stats(str(user["_id"]), period)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+async def receive_presentation(chunks: AsyncIterator[bytes], filename: str) -> Tuple[str, str]:
+    """Stream an upload to a temp file, rejecting it once it exceeds MAX_UPLOAD_SIZE; (path, sha256)."""
+    try:
+        return await save_stream(
+            chunks,
+            os.path.join(presentation_service.upload_dir, "incoming"),
+            os.path.splitext(filename)[1],
+            settings.MAX_UPLOAD_SIZE
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+async def handle_presentation(path: str, filename: str, file_hash: str, lazy: bool, user_id: Optional[str]) -> Dict:
+    try:
+        if lazy:
+            return await presentation_service.index_presentation(path, filename, file_hash, user_id)
+        return await presentation_service.process_presentation(path, filename, file_hash, user_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def owner_id(user: Optional[Dict]) -> Optional[str]:
+    """Id under which an upload is indexed for search; anonymous uploads are not indexed."""
+    return str(user["_id"]) if user is not None else None
+
+@app.post("/process-presentation")
+async def process_presentation(
+    file: UploadFile = File(...),
+    lazy: bool = False,
+    user: Optional[Dict] = Depends(get_optional_user)
+):
+    """Render every slide, or with lazy only index the deck and render slides on request."""
+    path, file_hash = await receive_presentation(
+        read_chunks(file, settings.UPLOAD_CHUNK_SIZE), file.filename
+    )
+    return await handle_presentation(path, file.filename, file_hash, lazy, owner_id(user))
+
+@app.post("/process-presentation/raw")
+async def process_presentation_raw(
+    request: Request,
+    filename: str,
+    lazy: bool = False,
+    user: Optional[Dict] = Depends(get_optional_user)
+):
+    """Same as /process-presentation with the file as the request body, streamed to disk as it arrives."""
+    path, file_hash = await receive_presentation(request.stream(), filename)
+    return await handle_presentation(path, filename, file_hash, lazy, owner_id(user))
+
+@app.get("/presentations/{deck_id}/slides/{number}")
+async def get_slide(deck_id: str, number: int, variant: str = "screen"):
+    """Image of one slide, rendered on first request."""
+    try:
+        slide = await presentation_service.get_slide(deck_id, number)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=e.args[0])
+    if variant not in slide["images"]:
+        raise HTTPException(status_code=400, detail=f"Unknown variant: {variant}")
+    return FileResponse(slide["images"][variant]["path"], media_type="image/webp")
+
+@app.post("/process-presentation/stream")
+async def stream_presentation(file: UploadFile = File(...), user: Optional[Dict] = Depends(get_optional_user)):
+    """Newline-delimited JSON: deck id and slide count first, then each slide as it is rendered."""
+    path, file_hash = await receive_presentation(
+        read_chunks(file, settings.UPLOAD_CHUNK_SIZE), file.filename
+    )
+    try:
+        deck_id, total_slides, slides = await presentation_service.stream_presentation(
+            path, file.filename, file_hash, owner_id(user)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def lines():
+        yield json.dumps({"deck_id": deck_id, "total_slides": total_slides}) + "\n"
+        async for slide in slides:
+            yield json.dumps(slide) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+@app.get("/presentations/search")
+async def search_slides(
+    q: str,
+    deck_id: Optional[str] = None,
+    limit: int = 10,
+    user: Dict = Depends(get_current_user)
+):
+    """Slides of the user's presentations mentioning every word of q; deck_id limits it to one deck."""
+    return {"results": presentation_service.search_slides(str(user["_id"]), q, deck_id, limit)}
+
+@app.get("/metrics")
+async def metrics():
+    return {
+        "trackers": tracker_pool.stats(),
+        "inference": inference_batcher.stats(),
+        "user_models": model_registry.stats(),
+        "slide_cache": presentation_service.cache.stats(),
+        "slide_search": presentation_service.search.stats(),
+        "gesture_log_buffer": get_database().gesture_log_buffer.stats(),
+        "auth_cache": user_cache.stats()
+    }
 
 if __name__ == "__main__":
     import uvicorn
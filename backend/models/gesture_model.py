@@ -1,3 +1,4 @@
+import os
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
@@ -53,6 +54,94 @@ class GestureRecognitionModel(nn.Module):
             _, predicted = torch.max(outputs, 1)
             return predicted
 
+class LandmarkGestureModel(nn.Module):
+    """Small MLP over normalized 21x3 hand landmarks (63 values)."""
+
+    def __init__(self, num_classes=10, input_size=63, hidden_size=128):
+        super(LandmarkGestureModel, self).__init__()
+
+        self.features = nn.Sequential(
+            nn.Linear(input_size, hidden_size),
+            nn.ReLU(inplace=True),
+            nn.Dropout(0.2),
+            nn.Linear(hidden_size, hidden_size // 2),
+            nn.ReLU(inplace=True),
+        )
+
+        self.classifier = nn.Linear(hidden_size // 2, num_classes)
+
+    def forward(self, x):
+        x = torch.flatten(x, 1)
+        x = self.features(x)
+        x = self.classifier(x)
+        return x
+
+    def predict(self, x):
+        with torch.no_grad():
+            outputs = self(x)
+            _, predicted = torch.max(outputs, 1)
+            return predicted
+
+MODEL_TYPES = {
+    "cnn": GestureRecognitionModel,
+    "landmark": LandmarkGestureModel
+}
+
+PRETRAINED_MODEL_PATHS = {
+    "cnn": "pretrained_gesture_model.pth",
+    "landmark": "pretrained_landmark_model.pth"
+}
+
+# Output classes of the pretrained model
+GESTURE_MAP = {
+    0: "point_right",  # Next slide
+    1: "point_left",   # Previous slide
+    2: "pointer",      # Display pointer
+    3: "palm_out",     # Erase drawing
+    4: "stop",         # Stop presentation
+    5: "open_hand",    # First slide
+    6: "peace",        # Last slide
+    7: "draw",         # Draw on screen
+    8: "save",         # Save slide/drawing
+    9: "highlight"     # Highlight text
+}
+
+# Per-sample input shape of each model type
+MODEL_INPUT_SHAPES = {
+    "cnn": (3, 224, 224),
+    "landmark": (63,)
+}
+
+# Eager fp32 state_dict, TorchScript, or int8 dynamically-quantized TorchScript
+MODEL_FORMATS = ("state_dict", "torchscript", "int8")
+
+def create_model(model_type="landmark", num_classes=10):
+    if model_type not in MODEL_TYPES:
+        raise ValueError(f"Unknown model type: {model_type}")
+    return MODEL_TYPES[model_type](num_classes=num_classes)
+
+def model_artifact_path(model_type="landmark", model_format="state_dict"):
+    """Default file of a model type in the given format."""
+    if model_format not in MODEL_FORMATS:
+        raise ValueError(f"Unknown model format: {model_format}")
+    path = PRETRAINED_MODEL_PATHS[model_type]
+    if model_format == "state_dict":
+        return path
+    return f"{os.path.splitext(path)[0]}.{model_format}.pt"
+
+def load_gesture_model(path=None, model_type="landmark", num_classes=10, device="cpu",
+                       model_format="state_dict"):
+    """Load a trained model of the given type and format for inference."""
+    path = path or model_artifact_path(model_type, model_format)
+    if model_format == "state_dict":
+        model = create_model(model_type, num_classes)
+        model.load_state_dict(torch.load(path, map_location=device))
+    elif model_format in MODEL_FORMATS:
+        model = torch.jit.load(path, map_location=device)
+    else:
+        raise ValueError(f"Unknown model format: {model_format}")
+    return model.to(device).eval()
+
 class GestureDataset(torch.utils.data.Dataset):
     def __init__(self, landmarks, labels):
         self.landmarks = torch.FloatTensor(landmarks)
@@ -0,0 +1,50 @@
+import asyncio
+import time
+from typing import Any, Dict, Optional, Tuple
+
+
+class LatestFrameSlot:
+    """Single-slot mailbox keeping only the newest unprocessed frame.
+
+    The receiver overwrites the slot on every message; a frame that is
+    replaced before the processor picks it up is counted as dropped. This
+    bounds the per-client backlog to one frame so gesture latency stays at
+    roughly one inference time, however slow inference gets.
+    """
+
+    def __init__(self):
+        self._frame: Optional[Tuple[Any, float]] = None
+        self._event = asyncio.Event()
+        self.closed = False
+        self.received = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def put(self, frame: Any):
+        """Store a frame, replacing (and dropping) any pending one."""
+        self.received += 1
+        if self._frame is not None:
+            self.dropped += 1
+        self._frame = (frame, time.monotonic())
+        self._event.set()
+
+    async def get(self) -> Optional[Tuple[Any, float]]:
+        """Wait for the newest frame and its receive time; None once closed."""
+        while self._frame is None:
+            if self.closed:
+                return None
+            self._event.clear()
+            await self._event.wait()
+        frame, self._frame = self._frame, None
+        return frame
+
+    def close(self):
+        self.closed = True
+        self._event.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "frames_received": self.received,
+            "frames_processed": self.processed,
+            "frames_dropped": self.dropped
+        }
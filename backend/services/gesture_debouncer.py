@@ -0,0 +1,74 @@
+import time
+from collections import Counter, deque
+from typing import Optional, Tuple
+
+NO_GESTURE = "no_gesture"
+
+
+class GestureDebouncer:
+    """Per-client state machine turning per-frame predictions into gesture events.
+
+    Frames vote over a sliding window. A gesture becomes active once it
+    holds at least enter_ratio of the window and stays active until its
+    share drops below exit_ratio (hysteresis). An event is emitted only
+    when a gesture becomes active, at most once per cooldown; a gesture
+    that wins during the cooldown becomes active once it is over, if it
+    still leads. A single no_gesture event is emitted when an active
+    gesture is released.
+    """
+
+    def __init__(
+        self,
+        window_size: int = 5,
+        enter_ratio: float = 0.6,
+        exit_ratio: float = 0.3,
+        cooldown: float = 0.75,
+        min_confidence: float = 0.7
+    ):
+        self.window_size = max(1, window_size)
+        self.enter_ratio = enter_ratio
+        self.exit_ratio = min(exit_ratio, enter_ratio)
+        self.cooldown = cooldown
+        self.min_confidence = min_confidence
+        self.votes = deque(maxlen=self.window_size)
+        self.active = NO_GESTURE
+        self.last_emitted_at = float("-inf")
+
+    def _share(self, gesture: str) -> float:
+        # Relative to the full window so a fresh window needs several frames
+        return sum(1 for g, _ in self.votes if g == gesture) / self.window_size
+
+    def _mean_confidence(self, gesture: str) -> float:
+        confidences = [c for g, c in self.votes if g == gesture]
+        return sum(confidences) / len(confidences)
+
+    def update(self, gesture: str, confidence: float, now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+        """Add one frame's prediction; returns (gesture, confidence) to emit, or None."""
+        now = time.monotonic() if now is None else now
+        if confidence < self.min_confidence:
+            gesture, confidence = NO_GESTURE, 0.0
+        self.votes.append((gesture, confidence))
+
+        # Hysteresis: the active gesture holds on to a lower share
+        if self.active != NO_GESTURE and self._share(self.active) >= self.exit_ratio:
+            return None
+
+        counts = Counter(g for g, _ in self.votes if g != NO_GESTURE)
+        leader, votes = counts.most_common(1)[0] if counts else (NO_GESTURE, 0)
+
+        if leader != NO_GESTURE and votes / self.window_size >= self.enter_ratio:
+            if now - self.last_emitted_at < self.cooldown:
+                # Not active yet: emitted by a later frame if it still leads once the cooldown is over
+                return None
+            self.active = leader
+            self.last_emitted_at = now
+            return leader, self._mean_confidence(leader)
+
+        if self.active != NO_GESTURE:
+            self.active = NO_GESTURE
+            return NO_GESTURE, 0.0
+        return None
+
+    def reset(self):
+        self.votes.clear()
+        self.active = NO_GESTURE
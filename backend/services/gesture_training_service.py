@@ -1,16 +1,26 @@
 import numpy as np
-import torch
-import torch.nn as nn
-from typing import List, Dict, Any
-from models.gesture_model import GestureRecognitionModel
-from database.mongodb import MongoDB
+from typing import List, Dict, Any, Callable, Optional, Tuple
+from models.gesture_model import GESTURE_MAP
+from database.mongodb import MongoDB, get_database
+from database.training_samples import samples_to_arrays
 from config.settings import settings
+from services.training_jobs import TrainingJobQueue, fine_tune_head
+from utils.preprocessing import normalize_landmarks
 
 class GestureTrainingService:
-    def __init__(self):
-        self.db = MongoDB(settings.MONGODB_URL)
-        self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        self.model = GestureRecognitionModel().to(self.device)
+    def __init__(self, on_trained: Optional[Callable[[Dict[str, Any]], None]] = None):
+        # Jobs only train a per-user classifier head on the base model the server runs
+        self.jobs = TrainingJobQueue(
+            settings.TRAINING_WORKERS,
+            on_complete=on_trained,
+            finished_ttl=settings.TRAINING_JOB_TTL_SECONDS,
+            max_finished=settings.TRAINING_JOB_MAX_FINISHED
+        )
+
+    @property
+    def db(self) -> MongoDB:
+        # Connected at application startup, after this service is created
+        return get_database()
         
     async def train_user_gesture(
         self,
@@ -18,97 +28,86 @@ class GestureTrainingService:
         gesture_name: str,
         training_data: List[Dict[str, Any]]
     ) -> Dict:
-        """Train model on user's custom gesture."""
+        """Queue training of a user's custom gesture and return its job id.
+
+        The user's head is retrained on every gesture they recorded so far,
+        so earlier custom gestures are kept.
+        """
         try:
+            gesture_name = gesture_name.strip()
+            if not gesture_name:
+                raise ValueError("Gesture name is required")
+            if settings.GESTURE_MODEL_TYPE != "landmark":
+                raise ValueError("Custom gestures need the landmark model")
+
             # Save training data
-            await self.db.save_training_data(user_id, gesture_name, training_data)
+            landmarks, timestamps = samples_to_arrays(training_data)
+            await self.db.save_training_data(user_id, gesture_name, landmarks, timestamps)
             
             # Prepare training data
-            processed_data = self._preprocess_training_data(training_data)
+            landmarks, labels, classes = await self._user_training_set(user_id)
             
-            # Fine-tune model
-            success = await self._fine_tune_model(processed_data, gesture_name)
+            # Train a personalized head on the shared features in the background
+            job_id = await self.jobs.submit(
+                fine_tune_head,
+                user_id,
+                model_path=settings.GESTURE_MODEL_PATH or None,
+                model_format=settings.GESTURE_MODEL_FORMAT,
+                landmarks=landmarks,
+                labels=labels,
+                classes=classes,
+                num_epochs=settings.USER_HEAD_EPOCHS,
+                learning_rate=settings.USER_HEAD_LEARNING_RATE,
+                replay_path=settings.BASE_LANDMARK_DATASET or None
+            )
             
-            if success:
-                # Save updated model for user
-                torch.save(
-                    self.model.state_dict(),
-                    f"{settings.MODEL_PATH}_{user_id}.pth"
-                )
-                
-                return {
-                    "success": True,
-                    "message": f"Successfully trained gesture: {gesture_name}"
-                }
-            else:
-                raise Exception("Training failed")
+            return {
+                "success": True,
+                "job_id": job_id,
+                "message": f"Training started for gesture: {gesture_name}"
+            }
                 
         except Exception as e:
             return {
                 "success": False,
                 "message": f"Training failed: {str(e)}"
             }
+
+    async def _user_training_set(self, user_id: str) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Normalized landmarks and labels of all of a user's sessions, and the head's classes.
+
+        Classes are the base model's gestures followed by the user's custom
+        ones in the order they were first recorded; recording a base gesture
+        adds samples to that class.
+        """
+        classes = [GESTURE_MAP[idx] for idx in range(len(GESTURE_MAP))]
+        landmarks = []
+        labels = []
+        async for session in self.db.iter_training_data(user_id):
+            if len(session["landmarks"]) == 0:
+                continue
+            if session["gesture_name"] not in classes:
+                classes.append(session["gesture_name"])
+            processed = self._preprocess_training_data(session["landmarks"], session["timestamps"])
+            landmarks.append(processed["landmarks"])
+            labels.append(np.full(len(processed["landmarks"]), classes.index(session["gesture_name"]), dtype=np.int64))
+        return np.concatenate(landmarks), np.concatenate(labels), classes
+
+    def get_training_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Status, epoch and loss of a training job."""
+        return self.jobs.get(job_id)
     
     def _preprocess_training_data(
         self,
-        training_data: List[Dict[str, Any]]
-    ) -> Dict[str, torch.Tensor]:
-        """Preprocess raw training data for model training."""
-        landmarks = []
-        timestamps = []
-        
-        for data in training_data:
-            landmarks.append(data["landmarks"])
-            timestamps.append(data["timestamp"])
-            
-        # Convert to tensors
-        X = torch.FloatTensor(landmarks).to(self.device)
-        timestamps = torch.FloatTensor(timestamps).to(self.device)
-        
+        landmarks: np.ndarray,
+        timestamps: np.ndarray
+    ) -> Dict[str, np.ndarray]:
+        """Preprocess (N, 21, 3) landmarks for model training."""
         return {
-            "landmarks": X,
+            "landmarks": np.array([normalize_landmarks(points) for points in landmarks], dtype=np.float32),
             "timestamps": timestamps
         }
     
-    async def _fine_tune_model(
-        self,
-        processed_data: Dict[str, torch.Tensor],
-        gesture_name: str
-    ) -> bool:
-        """Fine-tune model on new gesture data."""
-        try:
-            self.model.train()
-            optimizer = torch.optim.Adam(
-                self.model.parameters(),
-                lr=settings.LEARNING_RATE
-            )
-            criterion = nn.CrossEntropyLoss()
-            
-            # Training loop
-            for epoch in range(settings.NUM_EPOCHS):
-                optimizer.zero_grad()
-                
-                # Forward pass
-                outputs = self.model(processed_data["landmarks"])
-                
-                # Compute loss
-                target_idx = settings.GESTURE_CLASSES.index(gesture_name)
-                target = torch.LongTensor([target_idx] * len(outputs)).to(self.device)
-                loss = criterion(outputs, target)
-                
-                # Backward pass
-                loss.backward()
-                optimizer.step()
-                
-                if (epoch + 1) % 10 == 0:
-                    print(f"Epoch [{epoch+1}/{settings.NUM_EPOCHS}], Loss: {loss.item():.4f}")
-            
-            return True
-            
-        except Exception as e:
-            print(f"Training error: {str(e)}")
-            return False
-    
     async def get_user_gestures(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all trained gestures for a user."""
         try:
@@ -117,3 +116,5 @@ class GestureTrainingService:
             print(f"Error getting user gestures: {str(e)}")
             return []
 
+    def shutdown(self):
+        self.jobs.shutdown()
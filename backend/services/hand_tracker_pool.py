@@ -0,0 +1,96 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List
+
+
+class _TrackerWorker:
+    """Single-threaded executor owning the tracker instances of its clients."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix=f"hand-tracker-{index}"
+        )
+        # Only touched from the worker thread
+        self.trackers: Dict[str, Any] = {}
+        # Only touched from the event loop
+        self.clients = set()
+        self.queue_depth = 0
+        self.processed = 0
+
+
+class HandTrackerPool:
+    """Pool of tracker threads with one tracker instance per client.
+
+    Each client_id is pinned to the least loaded worker when it connects and
+    keeps its own tracker (e.g. MediaPipe Hands) for the lifetime of the
+    connection, so tracking state is never shared between cameras and a slow
+    frame only delays clients on the same worker.
+    """
+
+    def __init__(self, num_workers: int, tracker_factory: Callable[[], Any]):
+        if num_workers < 1:
+            raise ValueError("num_workers must be at least 1")
+        self.tracker_factory = tracker_factory
+        self.workers = [_TrackerWorker(i) for i in range(num_workers)]
+        self.assignments: Dict[str, _TrackerWorker] = {}
+
+    def assign(self, client_id: str) -> int:
+        """Pin a client to the worker with the fewest clients."""
+        worker = self.assignments.get(client_id)
+        if worker is None:
+            worker = min(self.workers, key=lambda w: (len(w.clients), w.queue_depth))
+            worker.clients.add(client_id)
+            self.assignments[client_id] = worker
+        return worker.index
+
+    async def submit(self, client_id: str, fn: Callable, *args) -> Any:
+        """Run fn(tracker, *args) on the client's worker thread."""
+        self.assign(client_id)
+        worker = self.assignments[client_id]
+        loop = asyncio.get_running_loop()
+
+        def run():
+            tracker = worker.trackers.get(client_id)
+            if tracker is None:
+                tracker = self.tracker_factory()
+                worker.trackers[client_id] = tracker
+            return fn(tracker, *args)
+
+        worker.queue_depth += 1
+        try:
+            return await loop.run_in_executor(worker.executor, run)
+        finally:
+            worker.queue_depth -= 1
+            worker.processed += 1
+
+    async def release(self, client_id: str):
+        """Close the client's tracker and unpin it from its worker."""
+        worker = self.assignments.pop(client_id, None)
+        if worker is None:
+            return
+        worker.clients.discard(client_id)
+
+        def close():
+            tracker = worker.trackers.pop(client_id, None)
+            if tracker is not None and hasattr(tracker, "close"):
+                tracker.close()
+
+        await asyncio.get_running_loop().run_in_executor(worker.executor, close)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Per-worker client count, queue depth and processed frame count."""
+        return [
+            {
+                "worker": worker.index,
+                "clients": len(worker.clients),
+                "queue_depth": worker.queue_depth,
+                "processed": worker.processed
+            }
+            for worker in self.workers
+        ]
+
+    def shutdown(self):
+        for worker in self.workers:
+            worker.executor.shutdown(wait=False)
@@ -0,0 +1,130 @@
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+
+class InferenceBatcher:
+    """Collects inference requests from all clients into micro-batches.
+
+    A batch is flushed as soon as it holds max_batch_size items or its
+    oldest item has waited max_wait_ms. run_batch receives the list of
+    submitted items and must return one result per item; it runs on a
+    dedicated thread so the event loop never blocks on a forward pass.
+    """
+
+    def __init__(
+        self,
+        run_batch: Callable[[List[Any]], List[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        history_size: int = 100
+    ):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._pending: List[tuple] = []
+        self._has_items: Optional[asyncio.Event] = None
+        self._full: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # Metrics
+        self.batches = 0
+        self.items = 0
+        self.total_wait_ms = 0.0
+        self.total_run_ms = 0.0
+        self.max_batch_seen = 0
+        self.recent = deque(maxlen=history_size)
+
+    def _ensure_started(self):
+        if self._task is None or self._task.done():
+            self._has_items = asyncio.Event()
+            self._full = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one item and wait for its result."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future, time.monotonic()))
+        self._has_items.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await self._has_items.wait()
+
+            # Give other clients until the oldest item's deadline to join
+            remaining = self._pending[0][2] + self.max_wait - time.monotonic()
+            if remaining > 0 and len(self._pending) < self.max_batch_size:
+                try:
+                    await asyncio.wait_for(self._full.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if not self._pending:
+                self._has_items.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+
+            started = time.monotonic()
+            wait_ms = (started - batch[0][2]) * 1000
+            try:
+                results = await loop.run_in_executor(
+                    self._executor, self.run_batch, [item for item, _, _ in batch]
+                )
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            run_ms = (time.monotonic() - started) * 1000
+
+            self.batches += 1
+            self.items += len(batch)
+            self.total_wait_ms += wait_ms
+            self.total_run_ms += run_ms
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            self.recent.append({
+                "size": len(batch),
+                "wait_ms": round(wait_ms, 2),
+                "run_ms": round(run_ms, 2)
+            })
+
+    def stats(self) -> Dict[str, Any]:
+        batches = max(self.batches, 1)
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "pending": len(self._pending),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / batches,
+            "largest_batch": self.max_batch_seen,
+            "avg_wait_ms": self.total_wait_ms / batches,
+            "avg_run_ms": self.total_run_ms / batches,
+            "recent_batches": list(self.recent)
+        }
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        for _, future, _ in self._pending:
+            if not future.done():
+                future.cancel()
+        self._pending = []
+        self._executor.shutdown(wait=False)
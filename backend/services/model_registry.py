@@ -0,0 +1,118 @@
+import asyncio
+import os
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import torch
+import torch.nn as nn
+
+from config.settings import settings
+
+# Bookkeeping cost charged for every cache entry, including users without a model
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def user_head_path(user_id: str) -> str:
+    """File holding the personalized classifier head of a user."""
+    return f"{settings.MODEL_PATH}_{user_id}.pth"
+
+
+def save_user_head(user_id: str, head: nn.Linear, classes: List[str]):
+    # Write then rename so a connecting socket never reads a partial file
+    path = user_head_path(user_id)
+    torch.save({"classes": list(classes), "state_dict": head.state_dict()}, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+class UserHead:
+    """Personalized classifier head applied on top of the shared base features."""
+
+    def __init__(self, module: nn.Linear, classes: List[str]):
+        self.module = module.eval()
+        self.classes = classes
+        self.nbytes = sum(p.numel() * p.element_size() for p in module.parameters())
+
+
+class UserModelRegistry:
+    """LRU cache of per-user model heads, bounded by their size in bytes.
+
+    Only the last layer is stored per user; the feature layers of the base
+    model are shared by everyone. Heads are loaded lazily from disk, and a
+    user without a custom model is cached as None so it costs no disk
+    access on the next lookup.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Optional[UserHead]]" = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _entry_bytes(head: Optional[UserHead]) -> int:
+        return ENTRY_OVERHEAD_BYTES + (head.nbytes if head is not None else 0)
+
+    def _load(self, user_id: str) -> Optional[UserHead]:
+        path = user_head_path(user_id)
+        if not os.path.exists(path):
+            return None
+        checkpoint = torch.load(path, map_location="cpu")
+        out_features, in_features = checkpoint["state_dict"]["weight"].shape
+        module = nn.Linear(in_features, out_features)
+        module.load_state_dict(checkpoint["state_dict"])
+        return UserHead(module, checkpoint["classes"])
+
+    def _load_safely(self, user_id: str) -> Optional[UserHead]:
+        try:
+            return self._load(user_id)
+        except Exception as e:
+            print(f"Error loading model for user {user_id}: {e}")
+            return None
+
+    def _insert(self, user_id: str, head: Optional[UserHead]) -> Optional[UserHead]:
+        self.misses += 1
+        self._entries[user_id] = head
+        self.bytes += self._entry_bytes(head)
+        self._evict()
+        return head
+
+    def get(self, user_id: str) -> Optional[UserHead]:
+        """Head of a user, loading it on a miss; blocks on disk I/O."""
+        if user_id in self._entries:
+            self.hits += 1
+            self._entries.move_to_end(user_id)
+            return self._entries[user_id]
+        return self._insert(user_id, self._load_safely(user_id))
+
+    async def acquire(self, user_id: str) -> Optional[UserHead]:
+        """Same as get, with the disk read off the event loop."""
+        if user_id in self._entries:
+            return self.get(user_id)
+        head = await asyncio.get_running_loop().run_in_executor(None, self._load_safely, user_id)
+        if user_id in self._entries:
+            # Loaded by a concurrent connection of the same user
+            return self.get(user_id)
+        return self._insert(user_id, head)
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._entries) > 1:
+            _, head = self._entries.popitem(last=False)
+            self.bytes -= self._entry_bytes(head)
+            self.evictions += 1
+
+    def invalidate(self, user_id: str):
+        """Forget a cached head, e.g. after the user retrained it."""
+        if user_id in self._entries:
+            self.bytes -= self._entry_bytes(self._entries.pop(user_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -1,86 +1,525 @@
 import os
+import time
+import asyncio
+import multiprocessing
+import shutil
 import fitz  # PyMuPDF for PDF processing
+from concurrent.futures import ProcessPoolExecutor
 from pptx import Presentation
 from PIL import Image
 import io
-from typing import List, Dict
+from functools import lru_cache
+from typing import AsyncIterator, Callable, List, Dict, Optional, Set, Tuple
 from config.settings import settings
+from services.slide_cache import SlideCache
+from services.slide_search import SlideSearchIndex
+from utils.uploads import file_sha256
+
+# Bump when rendering changes so cached decks are rendered again
+RENDER_VERSION = 2
+
+# Variant used for image_path, which clients without variant support load
+DEFAULT_VARIANT = "screen"
+
+def save_slide_variants(
+    img: Image.Image,
+    output_dir: str,
+    number: int,
+    widths: Dict[str, int],
+    quality: int
+) -> Dict[str, Dict]:
+    """Save a slide image at every variant width as WebP; img should be the largest one."""
+    variants = {}
+    # Largest first, so each variant is downscaled from the previous one
+    for name, width in sorted(widths.items(), key=lambda item: -item[1]):
+        width = min(width, img.width)
+        height = max(1, round(img.height * width / img.width))
+        if (width, height) != img.size:
+            img = img.resize((width, height), Image.LANCZOS, reducing_gap=2.0)
+        path = f"{output_dir}/slide_{number}_{name}.webp"
+        # Method 2 encodes about 2.5x faster than the default for a few percent in size
+        img.save(path, "WEBP", quality=quality, method=2)
+        variants[name] = {"path": path, "width": width, "height": height}
+    return {name: variants[name] for name in widths}
+
+def slide_entry(number: int, variants: Dict[str, Dict], text_content: str) -> Dict:
+    default = variants.get(DEFAULT_VARIANT) or next(iter(variants.values()))
+    return {
+        "number": number,
+        "image_path": default["path"],
+        "images": variants,
+        "text_content": text_content
+    }
+
+def render_pdf_pages(
+    pdf_path: str,
+    page_numbers: List[int],
+    output_dir: str,
+    widths: Dict[str, int],
+    quality: int
+) -> List[Dict]:
+    """Rasterize and extract text of a range of PDF pages; runs in a worker process.
+
+    Each page is rasterized once at the largest variant width and the
+    smaller variants are downscaled from that pixmap.
+    """
+    max_width = max(widths.values())
+    slides = []
+    with fitz.open(pdf_path) as pdf_document:
+        for i in page_numbers:
+            page = pdf_document[i]
+
+            # Convert page to image
+            scale = max_width / page.rect.width
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), alpha=False)
+            img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+            variants = save_slide_variants(img, output_dir, i + 1, widths, quality)
+
+            # Extract text
+            text_content = page.get_text()
+
+            slides.append(slide_entry(i + 1, variants, text_content))
+    return slides
+
+@lru_cache(maxsize=4)
+def open_powerpoint(path: str) -> Presentation:
+    """Parsed deck kept around while its slides are rendered on demand."""
+    return Presentation(path)
+
+def chunk_pages(page_count: int, chunk_size: int) -> List[List[int]]:
+    """Split pages into render tasks; the first slide gets a task of its own."""
+    if page_count == 0:
+        return []
+    chunk_size = max(1, chunk_size)
+    chunks = [[0]]
+    for start in range(1, page_count, chunk_size):
+        chunks.append(list(range(start, min(start + chunk_size, page_count))))
+    return chunks
 
 class PresentationService:
+    _render_pool = None
+
     def __init__(self):
         self.upload_dir = settings.UPLOAD_DIR
+        self.variant_widths = dict(settings.SLIDE_VARIANT_WIDTHS)
+        self.webp_quality = settings.SLIDE_WEBP_QUALITY
         os.makedirs(self.upload_dir, exist_ok=True)
+        self.cache = SlideCache(
+            settings.SLIDE_CACHE_DIR or os.path.join(self.upload_dir, "decks"),
+            settings.SLIDE_CACHE_MAX_BYTES
+        )
+        self.search = SlideSearchIndex(
+            settings.SEARCH_INDEX_PATH or os.path.join(self.upload_dir, "search_index.json")
+        )
+        self.search.load(self.cache.peek)
+        self.cache.on_evict = self.search.remove_deck
+        # Decks being rendered, so a concurrent identical upload waits for them
+        self._rendering: Dict[str, asyncio.Event] = {}
+        # Slides of lazily indexed decks being rendered, by (deck id, number)
+        self._slide_tasks: Dict[Tuple[str, int], asyncio.Task] = {}
+        # Streamed decks being completed, kept referenced until they finish
+        self._deck_tasks: Set[asyncio.Task] = set()
+
+    @classmethod
+    def render_pool(cls) -> ProcessPoolExecutor:
+        """Process pool shared by all service instances for page rendering."""
+        if cls._render_pool is None:
+            cls._render_pool = ProcessPoolExecutor(
+                max_workers=settings.RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return cls._render_pool
         
-    async def process_presentation(self, file: bytes, filename: str) -> Dict:
+    async def process_presentation(
+        self,
+        path: str,
+        filename: str,
+        file_hash: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict:
         """Process uploaded presentation file (PPT/PPTX/PDF)."""
-        file_ext = filename.split('.')[-1].lower()
+        deck_id, total_slides, slide_iter = await self.stream_presentation(path, filename, file_hash, user_id)
+        slides = [slide async for slide in slide_iter]
         
+        return {
+            "deck_id": deck_id,
+            "total_slides": total_slides,
+            "slides": slides
+        }
+
+    async def index_presentation(
+        self,
+        path: str,
+        filename: str,
+        file_hash: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Dict:
+        """Parse a deck and extract its text without rendering any slide.
+
+        Slides are rendered when first requested through get_slide. Like
+        stream_presentation, takes ownership of the file at path.
+        """
+        file_ext, render_settings, key, manifest = await self._lookup(path, filename, file_hash)
+        if manifest is not None:
+            self._discard(path)
+        else:
+            finish = self._claim(key)
+            try:
+                source_path = self._adopt(path, key, file_ext)
+                slides = await asyncio.get_running_loop().run_in_executor(
+                    None, self._index_deck, source_path, file_ext
+                )
+                manifest = {
+                    "deck_id": key,
+                    "filename": filename,
+                    "render": render_settings,
+                    "lazy": True,
+                    "source": os.path.basename(source_path),
+                    "total_slides": len(slides),
+                    "slides": slides,
+                    "created_at": time.time()
+                }
+                self.cache.store(key, manifest)
+            finally:
+                self._discard(path)
+                finish()
+        self._index_text(user_id, manifest)
+
+        return {
+            "deck_id": key,
+            "total_slides": manifest["total_slides"],
+            "slides": manifest["slides"]
+        }
+
+    def _index_deck(self, source_path: str, file_ext: str) -> List[Dict]:
+        """Extract the text of every slide."""
         if file_ext in ['ppt', 'pptx']:
-            return await self._process_powerpoint(file)
-        elif file_ext == 'pdf':
-            return await self._process_pdf(file)
+            presentation = open_powerpoint(source_path)
+            texts = [self._extract_slide_text(slide) for slide in presentation.slides]
         else:
+            with fitz.open(source_path) as pdf_document:
+                texts = [page.get_text() for page in pdf_document]
+        return [
+            {"number": i + 1, "text_content": text_content}
+            for i, text_content in enumerate(texts)
+        ]
+
+    def _index_text(self, user_id: Optional[str], manifest: Dict):
+        if user_id is not None:
+            self.search.add_deck(user_id, manifest)
+
+    def search_slides(
+        self,
+        user_id: str,
+        query: str,
+        deck_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict]:
+        """Slides of the user's decks mentioning every word of the query, best first."""
+        return self.search.search(user_id, query, deck_id, limit)
+
+    async def get_slide(self, deck_id: str, number: int) -> Dict:
+        """Entry of one slide, rendering it on first request and prefetching the next few."""
+        manifest = self.cache.load(deck_id) if SlideCache.valid_key(deck_id) else None
+        if manifest is None:
+            raise KeyError(f"Unknown presentation: {deck_id}")
+        total_slides = manifest["total_slides"]
+        if not 1 <= number <= total_slides:
+            raise KeyError(f"Slide {number} not in presentation of {total_slides} slides")
+        if not manifest.get("lazy"):
+            return manifest["slides"][number - 1]
+
+        slide = self._lazy_slide(deck_id, manifest, number)
+        for ahead in range(number + 1, min(number + settings.SLIDE_PREFETCH_AHEAD, total_slides) + 1):
+            if not self.cache.has_slide(deck_id, ahead):
+                self._slide_task(deck_id, manifest, ahead)
+        return await slide
+
+    def _lazy_slide(self, key: str, manifest: Dict, number: int) -> asyncio.Future:
+        """Future of a slide entry, starting its render unless it is on disk already."""
+        entry = self.cache.load_slide(key, number)
+        if entry is not None:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(entry)
+            return future
+        # Shielded: a client going away must not cancel a render others wait on
+        return asyncio.shield(self._slide_task(key, manifest, number))
+
+    def _slide_task(self, key: str, manifest: Dict, number: int) -> asyncio.Task:
+        task = self._slide_tasks.get((key, number))
+        if task is None:
+            task = asyncio.ensure_future(self._render_slide(key, manifest, number))
+            self._slide_tasks[(key, number)] = task
+            task.add_done_callback(lambda t: self._slide_rendered(key, number, t))
+        return task
+
+    def _slide_rendered(self, key: str, number: int, task: asyncio.Task):
+        self._slide_tasks.pop((key, number), None)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"Error rendering slide {number} of {key}: {task.exception()}")
+
+    async def _render_slide(self, key: str, manifest: Dict, number: int) -> Dict:
+        deck_dir = self.cache.deck_dir(key)
+        source_path = os.path.join(deck_dir, manifest["source"])
+        render = manifest["render"]
+        loop = asyncio.get_running_loop()
+        if render["format"] == "pdf":
+            slides = await loop.run_in_executor(
+                self.render_pool(), render_pdf_pages, source_path, [number - 1], deck_dir,
+                render["widths"], render["quality"]
+            )
+            entry = slides[0]
+        else:
+            entry = await loop.run_in_executor(
+                None, self._render_powerpoint_slide, source_path, number, deck_dir,
+                render["widths"], render["quality"]
+            )
+        self.cache.store_slide(key, number, entry)
+        return entry
+
+    def _render_powerpoint_slide(
+        self,
+        source_path: str,
+        number: int,
+        output_dir: str,
+        widths: Dict[str, int],
+        quality: int
+    ) -> Dict:
+        presentation = open_powerpoint(source_path)
+        return self._render_opened_slide(presentation, number, output_dir, widths, quality)
+
+    def _render_opened_slide(
+        self,
+        presentation: Presentation,
+        number: int,
+        output_dir: str,
+        widths: Dict[str, int],
+        quality: int
+    ) -> Dict:
+        slide = presentation.slides[number - 1]
+        img = self._render_slide_image(presentation, slide, max(widths.values()))
+        variants = save_slide_variants(img, output_dir, number, widths, quality)
+        return slide_entry(number, variants, self._extract_slide_text(slide))
+
+    def _file_ext(self, filename: str) -> str:
+        file_ext = filename.split('.')[-1].lower()
+        if file_ext not in ['ppt', 'pptx', 'pdf']:
             raise ValueError("Unsupported file format")
-    
-    async def _process_powerpoint(self, file: bytes) -> Dict:
-        """Convert PowerPoint to images and extract text."""
-        presentation = Presentation(io.BytesIO(file))
-        slides = []
-        
-        for i, slide in enumerate(presentation.slides):
-            # Save slide as image
-            img_path = f"{self.upload_dir}/slide_{i+1}.png"
-            self._save_slide_as_image(slide, img_path)
-            
-            # Extract text content
-            text_content = self._extract_slide_text(slide)
-            
-            slides.append({
-                "number": i + 1,
-                "image_path": img_path,
-                "text_content": text_content
-            })
-        
+        return file_ext
+
+    async def _lookup(self, path: str, filename: str, file_hash: Optional[str]) -> Tuple[str, Dict, str, Optional[Dict]]:
+        """Format, render settings, deck key and cached manifest of an upload.
+
+        Waits for a deck being rendered, and removes the upload on errors.
+        """
+        try:
+            file_ext = self._file_ext(filename)
+            render_settings = self._render_settings(file_ext)
+            if file_hash is None:
+                file_hash = await asyncio.get_running_loop().run_in_executor(None, file_sha256, path)
+            key = SlideCache.key(file_hash, render_settings)
+
+            rendering = self._rendering.get(key)
+            if rendering is not None:
+                await rendering.wait()
+            return file_ext, render_settings, key, self.cache.load(key)
+        except BaseException:
+            self._discard(path)
+            raise
+
+    def _claim(self, key: str) -> Callable[[], None]:
+        """Mark a deck as being rendered; call the result once it is done."""
+        done = asyncio.Event()
+        self._rendering[key] = done
+
+        def finish():
+            done.set()
+            self._rendering.pop(key, None)
+
+        return finish
+
+    def _adopt(self, path: str, key: str, file_ext: str) -> str:
+        """Move an upload into its deck directory, where renderers open it."""
+        source_path = os.path.join(self.cache.prepare(key), f"source.{file_ext}")
+        shutil.move(path, source_path)
+        return source_path
+
+    @staticmethod
+    def _discard(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def _render_settings(self, file_ext: str) -> Dict:
         return {
-            "total_slides": len(slides),
-            "slides": slides
+            "format": file_ext,
+            "widths": self.variant_widths,
+            "quality": self.webp_quality,
+            "version": RENDER_VERSION
         }
-    
-    async def _process_pdf(self, file: bytes) -> Dict:
-        """Convert PDF to images and extract text."""
-        pdf_document = fitz.open(stream=file, filetype="pdf")
-        slides = []
-        
-        for i in range(pdf_document.page_count):
-            page = pdf_document[i]
-            
-            # Convert page to image
-            pix = page.get_pixmap()
-            img_path = f"{self.upload_dir}/slide_{i+1}.png"
-            pix.save(img_path)
-            
-            # Extract text
-            text_content = page.get_text()
-            
-            slides.append({
-                "number": i + 1,
-                "image_path": img_path,
-                "text_content": text_content
-            })
-        
-        return {
-            "total_slides": len(slides),
-            "slides": slides
+
+    async def stream_presentation(
+        self,
+        path: str,
+        filename: str,
+        file_hash: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> Tuple[str, int, AsyncIterator[Dict]]:
+        """Deck id, slide count and an iterator yielding slides in order as they are rendered.
+
+        Takes ownership of the uploaded file at path: it is moved into the
+        cache for rendering or removed. Decks are cached by content, so an
+        identical upload returns the slides of the first one without
+        rendering anything. file_hash is the sha256 of the file, if the
+        caller computed it while receiving the upload. With a user_id, the
+        slide text is added to that user's search index. Rendering goes on
+        and the deck is cached even if the iterator is never consumed.
+        """
+        file_ext, render_settings, key, manifest = await self._lookup(path, filename, file_hash)
+        if manifest is not None:
+            self._discard(path)
+            self._index_text(user_id, manifest)
+            return key, manifest["total_slides"], self._iter_slides(key, manifest)
+
+        finish = self._claim(key)
+        try:
+            source_path = self._adopt(path, key, file_ext)
+            output_dir = os.path.dirname(source_path)
+            if file_ext in ['ppt', 'pptx']:
+                total_slides, chunks = await self._process_powerpoint(source_path, output_dir)
+            else:
+                total_slides, chunks = await self._process_pdf(source_path, output_dir)
+        except BaseException:
+            self._discard(path)
+            finish()
+            raise
+
+        # Completed by the renders rather than the caller, who may never iterate the slides
+        task = asyncio.ensure_future(
+            self._complete_deck(key, filename, render_settings, total_slides, chunks, user_id)
+        )
+        self._deck_tasks.add(task)
+        task.add_done_callback(self._deck_tasks.discard)
+        task.add_done_callback(lambda _: finish())
+
+        async def slides():
+            for chunk in chunks:
+                # Shielded: a client going away must not cancel the render
+                for slide in await asyncio.shield(chunk):
+                    yield slide
+
+        return key, total_slides, slides()
+
+    async def _complete_deck(
+        self,
+        key: str,
+        filename: str,
+        render_settings: Dict,
+        total_slides: int,
+        chunks: List[asyncio.Future],
+        user_id: Optional[str]
+    ):
+        """Cache and index a streamed deck once every slide is rendered; nothing is cached if one failed."""
+        results = await asyncio.gather(*chunks, return_exceptions=True)
+        errors = [result for result in results if isinstance(result, BaseException)]
+        if errors:
+            print(f"Error rendering {filename}: {errors[0]}")
+            return
+        rendered = [slide for chunk in results for slide in chunk]
+        if len(rendered) != total_slides:
+            return
+        manifest = {
+            "deck_id": key,
+            "filename": filename,
+            "render": render_settings,
+            "total_slides": total_slides,
+            "slides": rendered,
+            "created_at": time.time()
         }
+        self.cache.store(key, manifest)
+        self._index_text(user_id, manifest)
+
+    async def _iter_slides(self, key: str, manifest: Dict) -> AsyncIterator[Dict]:
+        if not manifest.get("lazy"):
+            for slide in manifest["slides"]:
+                yield slide
+            return
+
+        # Indexed lazily: render every slide not requested so far, in parallel
+        slides = [
+            self._lazy_slide(key, manifest, number)
+            for number in range(1, manifest["total_slides"] + 1)
+        ]
+        for slide in slides:
+            yield await slide
     
-    def _save_slide_as_image(self, slide, path: str):
-        """Save PowerPoint slide as image."""
-        # Get presentation from slide
-        presentation = slide.part.package.presentation
-        
-        # Get slide dimensions
-        width = int(presentation.slide_width * 0.75)  # Convert EMU to pixels (approximate)
-        height = int(presentation.slide_height * 0.75)
+    async def _process_powerpoint(self, pptx_path: str, output_dir: str) -> Tuple[int, List[asyncio.Future]]:
+        """Start converting PowerPoint to images; slide count and one future per slide, in order.
+
+        Each future holds a list with the slide's entry. Removes the file
+        once it is parsed.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            presentation = await loop.run_in_executor(None, Presentation, pptx_path)
+        finally:
+            os.remove(pptx_path)
+
+        futures = [loop.create_future() for _ in presentation.slides]
+
+        async def render():
+            # Off the event loop, one slide at a time so each is sent as soon as it is ready
+            for number, future in enumerate(futures, start=1):
+                try:
+                    entry = await loop.run_in_executor(
+                        None, self._render_opened_slide, presentation, number, output_dir,
+                        self.variant_widths, self.webp_quality
+                    )
+                except Exception as e:
+                    for pending in futures[number - 1:]:
+                        pending.set_exception(e)
+                    return
+                future.set_result([entry])
+
+        task = asyncio.ensure_future(render())
+        self._deck_tasks.add(task)
+        task.add_done_callback(self._deck_tasks.discard)
+        return len(futures), futures
+    
+    async def _process_pdf(self, pdf_path: str, output_dir: str) -> Tuple[int, List[asyncio.Future]]:
+        """Start converting PDF to images, rendering pages in parallel; page count and the futures of page chunks, in order.
+
+        Removes the file once every chunk is done.
+        """
+        # Workers open the document from disk instead of receiving its bytes
+        try:
+            with fitz.open(pdf_path) as pdf_document:
+                page_count = pdf_document.page_count
+        except Exception:
+            os.remove(pdf_path)
+            raise
+
+        loop = asyncio.get_running_loop()
+        pool = self.render_pool()
+        futures = [
+            loop.run_in_executor(
+                pool, render_pdf_pages, pdf_path, pages, output_dir,
+                self.variant_widths, self.webp_quality
+            )
+            for pages in chunk_pages(page_count, settings.RENDER_CHUNK_PAGES)
+        ]
+
+        rendered = asyncio.gather(*futures, return_exceptions=True)
+        rendered.add_done_callback(lambda _: self._discard(pdf_path))
+        return page_count, futures
+    
+    def _render_slide_image(self, presentation, slide, width: int) -> Image.Image:
+        """Render PowerPoint slide at the given width."""
+        # Slide dimensions are in EMU
+        scale = width / presentation.slide_width
+        width = int(presentation.slide_width * scale)
+        height = int(presentation.slide_height * scale)
 
         # Create slide image
         img = Image.new('RGB', (width, height), 'white')
@@ -88,16 +527,15 @@ class PresentationService:
         # Render shapes onto image
         for shape in slide.shapes:
             if shape.shape_type == 1:  # Text box
-                left = int(shape.left * 0.75)
-                top = int(shape.top * 0.75)
+                left = int(shape.left * scale)
+                top = int(shape.top * scale)
                 if hasattr(shape, "text"):
                     # Add text to image - basic implementation
                     from PIL import ImageDraw
                     draw = ImageDraw.Draw(img)
                     draw.text((left, top), shape.text, fill='black')
         
-        # Save the image
-        img.save(path, 'PNG')
+        return img
     
     def _extract_slide_text(self, slide) -> str:
         """Extract text content from PowerPoint slide."""
@@ -0,0 +1,195 @@
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+MANIFEST_NAME = "manifest.json"
+KEY_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class SlideCache:
+    """Content-addressed on-disk cache of rendered decks.
+
+    Each deck lives in its own directory named by a hash of the file bytes
+    and the render settings, so identical uploads share one rendering and
+    concurrent uploads of different decks never write to the same paths.
+    A deck is complete once its manifest exists; the manifest's mtime is
+    its last use, and the least recently used decks are evicted when the
+    cache grows beyond max_bytes.
+
+    The size and last use of every deck are scanned from disk once and
+    then kept up to date as decks are written, so eviction and stats never
+    walk the cache. Not thread safe: call it from the event loop only.
+    """
+
+    def __init__(self, root: str, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # Called with the key of every evicted deck
+        self.on_evict: Optional[Callable[[str], None]] = None
+        os.makedirs(self.root, exist_ok=True)
+        # key -> [last use, bytes]
+        self._decks: Dict[str, List[float]] = {
+            key: [last_used, size] for last_used, key, size in self._scan()
+        }
+        self.bytes = sum(size for _, size in self._decks.values())
+
+    @staticmethod
+    def key(file_hash: str, render_settings: Dict[str, Any]) -> str:
+        """Deck key from the sha256 of the file and the render settings."""
+        payload = json.dumps({"file": file_hash, "render": render_settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def valid_key(key: str) -> bool:
+        """Whether a client supplied deck id can name a cache directory."""
+        return KEY_PATTERN.fullmatch(key) is not None
+
+    def deck_dir(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.deck_dir(key), MANIFEST_NAME)
+
+    def prepare(self, key: str) -> str:
+        """Create the directory a deck is rendered into."""
+        deck_dir = self.deck_dir(key)
+        os.makedirs(deck_dir, exist_ok=True)
+        self._decks.setdefault(key, [time.time(), 0])
+        return deck_dir
+
+    def _set_size(self, key: str, size: int):
+        deck = self._decks.setdefault(key, [time.time(), 0])
+        self.bytes += size - deck[1]
+        deck[1] = size
+
+    def _touch(self, key: str):
+        self._decks.setdefault(key, [0.0, 0])[0] = time.time()
+
+    def peek(self, key: str) -> Optional[Dict[str, Any]]:
+        """Manifest of a complete deck without counting or marking it as used."""
+        try:
+            with open(self._manifest_path(key)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Manifest of a complete deck, or None; marks the deck as used."""
+        path = self._manifest_path(key)
+        try:
+            with open(path) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        os.utime(path)
+        self._touch(key)
+        self.hits += 1
+        return manifest
+
+    @staticmethod
+    def _write_json(path: str, data: Dict[str, Any]):
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(data, f)
+        os.replace(f"{path}.tmp", path)
+
+    def store(self, key: str, manifest: Dict[str, Any]):
+        """Mark a rendered deck complete by writing its manifest atomically."""
+        self._write_json(self._manifest_path(key), manifest)
+        # Only this deck's own files, just written
+        self._set_size(key, self._dir_size(self.deck_dir(key)))
+        self._touch(key)
+        self.evict(keep=key)
+
+    def _slide_path(self, key: str, number: int) -> str:
+        return os.path.join(self.deck_dir(key), f"slide_{number}.json")
+
+    def load_slide(self, key: str, number: int) -> Optional[Dict[str, Any]]:
+        """Entry of a slide rendered on demand, or None if it is not rendered yet."""
+        try:
+            with open(self._slide_path(key, number)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def has_slide(self, key: str, number: int) -> bool:
+        return os.path.exists(self._slide_path(key, number))
+
+    def store_slide(self, key: str, number: int, entry: Dict[str, Any]):
+        """Mark a slide rendered on demand complete; written after its images."""
+        path = self._slide_path(key, number)
+        self._write_json(path, entry)
+        paths = [path] + [image["path"] for image in entry["images"].values()]
+        added = 0
+        for path in paths:
+            try:
+                added += os.path.getsize(path)
+            except OSError:
+                pass
+        self._set_size(key, self._decks.get(key, [0.0, 0])[1] + added)
+        self.evict(keep=key)
+
+    @staticmethod
+    def _dir_size(path: str) -> int:
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def _scan(self) -> List[Tuple[float, str, int]]:
+        """(last use, key, bytes) of every deck directory on disk."""
+        decks = []
+        for key in os.listdir(self.root):
+            deck_dir = self.deck_dir(key)
+            if not os.path.isdir(deck_dir):
+                continue
+            try:
+                last_used = os.path.getmtime(self._manifest_path(key))
+            except OSError:
+                # Still rendering, or abandoned half way
+                last_used = os.path.getmtime(deck_dir)
+            decks.append((last_used, key, self._dir_size(deck_dir)))
+        return decks
+
+    def evict(self, keep: Optional[str] = None, min_age: float = 3600.0):
+        """Remove least recently used decks until the cache fits in max_bytes.
+
+        Directories without a manifest are only removed once they are older
+        than min_age, since they may still be rendering.
+        """
+        if self.bytes <= self.max_bytes:
+            return
+        now = time.time()
+        for last_used, key in sorted((deck[0], key) for key, deck in self._decks.items()):
+            if self.bytes <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            if not os.path.exists(self._manifest_path(key)) and now - last_used < min_age:
+                continue
+            shutil.rmtree(self.deck_dir(key), ignore_errors=True)
+            self.bytes -= self._decks.pop(key)[1]
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "decks": len(self._decks),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,198 @@
+import os
+import re
+import json
+import math
+import heapq
+from bisect import bisect_left, insort
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+TOKEN_PATTERN = re.compile(r"\w+")
+SNIPPET_CHARS = 80
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+Slide = Tuple[str, int]
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class _UserIndex:
+    """Postings of the slides of one user's decks."""
+
+    def __init__(self):
+        self.decks: Dict[str, str] = {}
+        self.postings: Dict[str, Dict[Slide, int]] = defaultdict(dict)
+        self.terms: List[str] = []
+        self.lengths: Dict[Slide, int] = {}
+        self.total_length = 0
+
+    def add(self, deck_id: str, filename: str, texts: List[str]):
+        self.decks[deck_id] = filename
+        for number, text in enumerate(texts, start=1):
+            tokens = tokenize(text)
+            slide = (deck_id, number)
+            self.lengths[slide] = len(tokens)
+            self.total_length += len(tokens)
+            counts: Dict[str, int] = defaultdict(int)
+            for token in tokens:
+                counts[token] += 1
+            for term, count in counts.items():
+                if term not in self.postings:
+                    insort(self.terms, term)
+                self.postings[term][slide] = count
+
+    def remove(self, deck_id: str, texts: List[str]):
+        del self.decks[deck_id]
+        for number, text in enumerate(texts, start=1):
+            slide = (deck_id, number)
+            self.total_length -= self.lengths.pop(slide, 0)
+            for term in set(tokenize(text)):
+                postings = self.postings.get(term)
+                if postings is None:
+                    continue
+                postings.pop(slide, None)
+                if not postings:
+                    del self.postings[term]
+                    del self.terms[bisect_left(self.terms, term)]
+
+    def expand(self, prefix: str) -> List[str]:
+        """Indexed terms starting with prefix."""
+        start = bisect_left(self.terms, prefix)
+        end = start
+        while end < len(self.terms) and self.terms[end].startswith(prefix):
+            end += 1
+        return self.terms[start:end]
+
+
+class SlideSearchIndex:
+    """In-process inverted index over the text of each user's slides.
+
+    Decks are added as they are uploaded and scored with BM25; the last
+    query term also matches as a prefix, so results update while typing.
+    Only which decks belong to which user is saved to disk: the text is
+    read back from the slide cache manifests on startup.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._users: Dict[str, _UserIndex] = {}
+        # Slide text per deck, shared by every user owning it
+        self._texts: Dict[str, List[str]] = {}
+
+    def load(self, read_manifest):
+        """Rebuild from the saved deck list; read_manifest(deck_id) returns a manifest or None."""
+        try:
+            with open(self.path) as f:
+                owners = json.load(f)
+        except (OSError, ValueError):
+            return
+        for user_id, deck_ids in owners.items():
+            for deck_id in deck_ids:
+                manifest = read_manifest(deck_id)
+                if manifest is not None:
+                    self._add(user_id, manifest, save=False)
+        self._save()
+
+    def _save(self):
+        owners = {user_id: list(index.decks) for user_id, index in self._users.items()}
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(f"{self.path}.tmp", "w") as f:
+            json.dump(owners, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def add_deck(self, user_id: str, manifest: Dict[str, Any]):
+        """Index the slide text of a deck manifest for a user; no-op if already indexed."""
+        self._add(user_id, manifest, save=True)
+
+    def _add(self, user_id: str, manifest: Dict[str, Any], save: bool):
+        deck_id = manifest["deck_id"]
+        index = self._users.setdefault(user_id, _UserIndex())
+        if deck_id in index.decks:
+            return
+        texts = self._texts.setdefault(
+            deck_id, [slide.get("text_content", "") for slide in manifest["slides"]]
+        )
+        index.add(deck_id, manifest.get("filename", ""), texts)
+        if save:
+            self._save()
+
+    def remove_deck(self, deck_id: str, user_id: Optional[str] = None):
+        """Drop a deck for one user, or for everyone, e.g. once it left the cache."""
+        texts = self._texts.get(deck_id)
+        if texts is None:
+            return
+        user_ids = [user_id] if user_id is not None else list(self._users)
+        for uid in user_ids:
+            index = self._users.get(uid)
+            if index is not None and deck_id in index.decks:
+                index.remove(deck_id, texts)
+        if not any(deck_id in index.decks for index in self._users.values()):
+            del self._texts[deck_id]
+        self._save()
+
+    def search(
+        self,
+        user_id: str,
+        query: str,
+        deck_id: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Slides of a user containing every query term, best first."""
+        index = self._users.get(user_id)
+        terms = tokenize(query)
+        if index is None or not terms or not index.lengths:
+            return []
+
+        num_slides = len(index.lengths)
+        avg_length = index.total_length / num_slides
+        scores: Optional[Dict[Slide, float]] = None
+        for i, term in enumerate(terms):
+            matches = index.expand(term) if i == len(terms) - 1 else [term]
+            term_scores: Dict[Slide, float] = defaultdict(float)
+            for match in matches:
+                postings = index.postings.get(match, {})
+                idf = math.log(1 + (num_slides - len(postings) + 0.5) / (len(postings) + 0.5))
+                for slide, count in postings.items():
+                    if deck_id is not None and slide[0] != deck_id:
+                        continue
+                    norm = K1 * (1 - B + B * index.lengths[slide] / avg_length)
+                    term_scores[slide] += idf * count * (K1 + 1) / (count + norm)
+            # Every term has to match
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {slide: score + term_scores[slide] for slide, score in scores.items() if slide in term_scores}
+            if not scores:
+                return []
+
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [
+            {
+                "deck_id": slide[0],
+                "filename": index.decks[slide[0]],
+                "number": slide[1],
+                "score": round(score, 4),
+                "snippet": self._snippet(self._texts[slide[0]][slide[1] - 1], terms)
+            }
+            for slide, score in best
+        ]
+
+    @staticmethod
+    def _snippet(text: str, terms: List[str]) -> str:
+        lowered = text.lower()
+        positions = [p for p in (lowered.find(term) for term in terms) if p >= 0]
+        start = max(0, min(positions, default=0) - SNIPPET_CHARS // 4)
+        return " ".join(text[start:start + SNIPPET_CHARS].split())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "users": len(self._users),
+            "decks": len(self._texts),
+            "slides": sum(len(index.lengths) for index in self._users.values()),
+            "terms": sum(len(index.terms) for index in self._users.values())
+        }
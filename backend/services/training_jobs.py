@@ -0,0 +1,231 @@
+import asyncio
+import multiprocessing
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+
+from models.gesture_model import GESTURE_MAP, load_gesture_model
+from services.model_registry import save_user_head
+
+
+def random_hands(rng: np.random.Generator, n: int) -> np.ndarray:
+    """(n, 63) random point clouds, normalized like real landmarks."""
+    points = rng.normal(size=(n, 21, 3)).astype(np.float32)
+    points -= points.mean(axis=1, keepdims=True)
+    points /= np.abs(points).max(axis=(1, 2), keepdims=True)
+    return points.reshape(n, -1)
+
+
+def load_replay(path: str, num_base: int, per_class: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """Up to per_class samples of each base class from a built landmark dataset."""
+    from training.landmark_dataset import load_landmark_dataset
+
+    landmarks, labels, _ = load_landmark_dataset(path)
+    rows = []
+    for label in range(num_base):
+        candidates = np.flatnonzero(labels == label)
+        rows.extend(rng.choice(candidates, min(per_class, len(candidates)), replace=False))
+    rows = np.array(rows, dtype=np.int64)
+    return landmarks[rows], labels[rows]
+
+
+def classifier_parameters(classifier) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Float weight and bias of a model's final Linear layer, in any model format."""
+    weight = getattr(classifier, "weight", None)
+    if isinstance(weight, torch.Tensor):
+        return weight.detach().float(), classifier.bias.detach().float()
+    if callable(weight):
+        # Dynamically quantized Linear
+        return classifier.weight().dequantize(), classifier.bias().detach()
+    # The traced int8 Linear only keeps its packed parameters
+    weight, bias = torch.ops.quantized.linear_unpack(classifier._packed_params._packed_params)
+    return weight.dequantize(), bias.detach()
+
+
+def fine_tune_head(
+    job_id: str,
+    progress,
+    model_path: Optional[str],
+    model_format: str,
+    landmarks: np.ndarray,
+    labels: np.ndarray,
+    classes: List[str],
+    user_id: str,
+    num_epochs: int,
+    learning_rate: float,
+    replay_path: Optional[str] = None,
+    replay_per_class: int = 200,
+    num_anchors: int = 2048,
+    distill_weight: float = 20.0,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """Train a user's classifier head on frozen base features; runs in a worker process.
+
+    The head covers the base classes followed by the user's custom ones.
+    Its base rows are the base classifier, copied and frozen, so base
+    gestures score exactly as before; only the custom rows are trained,
+    on the user's samples of every gesture they recorded, replayed samples
+    of the base classes when replay_path is set, and random hands that
+    should keep their base prediction. Those weigh distill_weight times
+    the user's samples: without replay, they are the only examples of
+    where a custom gesture must not win. The base model is loaded the same
+    way the server loads it, so heads see the same features.
+    """
+    model = load_gesture_model(
+        model_path, model_type="landmark", num_classes=len(GESTURE_MAP), model_format=model_format
+    )
+    num_base = len(GESTURE_MAP)
+    rng = np.random.default_rng(seed)
+    if replay_path:
+        replay_landmarks, replay_labels = load_replay(replay_path, num_base, replay_per_class, rng)
+        landmarks = np.concatenate([landmarks, replay_landmarks])
+        labels = np.concatenate([labels, replay_labels])
+
+    with torch.no_grad():
+        features = model.features(torch.from_numpy(landmarks))
+        anchor_features = model.features(torch.from_numpy(random_hands(rng, num_anchors)))
+        base_logits = model.classifier(anchor_features).float()
+
+    base_weight, base_bias = classifier_parameters(model.classifier)
+    head = nn.Linear(anchor_features.shape[1], len(classes))
+    target = torch.from_numpy(np.asarray(labels, dtype=np.int64))
+    with torch.no_grad():
+        head.weight[:num_base] = base_weight
+        head.bias[:num_base] = base_bias
+        # Custom classes start below every base class and are learned from the user's samples
+        head.weight[num_base:] = 0
+        head.bias[num_base:] = base_logits.min() - 1
+
+    # Base rows never get a gradient, so Adam never moves them
+    trainable = torch.zeros(len(classes), 1)
+    trainable[num_base:] = 1
+    head.weight.register_hook(lambda grad: grad * trainable)
+    head.bias.register_hook(lambda grad: grad * trainable[:, 0])
+
+    # Soft targets: the base model's distribution, zero for custom classes
+    anchor_targets = torch.zeros(num_anchors, len(classes))
+    anchor_targets[:, :num_base] = torch.softmax(base_logits, 1)
+
+    optimizer = torch.optim.Adam(head.parameters(), lr=learning_rate)
+    criterion = nn.CrossEntropyLoss()
+    loss = torch.tensor(float("nan"))
+
+    for epoch in range(num_epochs):
+        optimizer.zero_grad()
+        loss = criterion(head(features), target)
+        distill = criterion(head(anchor_features), anchor_targets)
+        (loss + distill_weight * distill).backward()
+        optimizer.step()
+
+        progress[job_id] = {
+            "status": "running",
+            "epoch": epoch + 1,
+            "num_epochs": num_epochs,
+            "loss": loss.item()
+        }
+
+    save_user_head(user_id, head, classes)
+    return {"loss": loss.item(), "classes": classes}
+
+
+class TrainingJobQueue:
+    """Runs training jobs in a process pool and tracks their progress.
+
+    submit() returns a job id right away; workers publish epoch and loss
+    through a shared dict so get() can be polled from request handlers.
+    Finished jobs are forgotten after finished_ttl seconds, or sooner once
+    more than max_finished of them are kept.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 1,
+        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+        finished_ttl: float = 3600.0,
+        max_finished: int = 1000
+    ):
+        self.max_workers = max_workers
+        self.on_complete = on_complete
+        self.finished_ttl = finished_ttl
+        self.max_finished = max_finished
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        # Finished job ids, oldest first
+        self._finished: "OrderedDict[str, float]" = OrderedDict()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+        self._progress = None
+        self._start_lock = asyncio.Lock()
+
+    def _start(self):
+        # Spawn instead of fork: the server process runs threads
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+
+    async def submit(self, fn: Callable, user_id: str, **kwargs) -> str:
+        """Queue fn(job_id, progress, user_id=..., **kwargs) and return the job id."""
+        self._prune()
+        async with self._start_lock:
+            if self._executor is None:
+                # Starting the manager process takes a moment; keep it off the loop
+                await asyncio.get_running_loop().run_in_executor(None, self._start)
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {
+            "job_id": job_id,
+            "user_id": user_id,
+            "status": "queued",
+            "submitted_at": time.time()
+        }
+        future = asyncio.wrap_future(
+            self._executor.submit(fn, job_id, self._progress, user_id=user_id, **kwargs)
+        )
+        future.add_done_callback(lambda f: self._finish(job_id, f))
+        return job_id
+
+    def _finish(self, job_id: str, future: asyncio.Future):
+        job = self.jobs[job_id]
+        job.update(self._progress.pop(job_id, {}))
+        job["finished_at"] = time.time()
+        self._finished[job_id] = job["finished_at"]
+        if future.cancelled():
+            job["status"] = "cancelled"
+        elif future.exception() is not None:
+            job["status"] = "failed"
+            job["error"] = str(future.exception())
+        else:
+            job["status"] = "completed"
+            job.update(future.result())
+        if self.on_complete is not None:
+            self.on_complete(job)
+        self._prune()
+
+    def _prune(self):
+        expired = time.time() - self.finished_ttl
+        while self._finished:
+            job_id, finished_at = next(iter(self._finished.items()))
+            if finished_at > expired and len(self._finished) <= self.max_finished:
+                break
+            del self._finished[job_id]
+            self.jobs.pop(job_id, None)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Current state of a job, including the latest epoch and loss."""
+        self._prune()
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        if job["status"] in ("queued", "running") and self._progress is not None:
+            job = {**job, **self._progress.get(job_id, {})}
+        return job
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._manager.shutdown()
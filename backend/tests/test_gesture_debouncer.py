@@ -0,0 +1,59 @@
+from services.gesture_debouncer import NO_GESTURE, GestureDebouncer
+
+FPS = 15
+
+
+def feed(debouncer, gestures, start=0.0, confidence=0.9):
+    """Feed one prediction per frame at FPS; returns the (time, event) pairs emitted."""
+    events = []
+    for i, gesture in enumerate(gestures):
+        now = start + i / FPS
+        event = debouncer.update(gesture, confidence, now=now)
+        if event is not None:
+            events.append((now, event[0]))
+    return events
+
+
+def test_steady_gesture_is_emitted_once():
+    events = feed(GestureDebouncer(), ["next"] * 30)
+    assert [g for _, g in events] == ["next"]
+
+
+def test_single_frame_flicker_is_ignored():
+    events = feed(GestureDebouncer(), ["next"] * 10 + ["prev"] + ["next"] * 10)
+    assert [g for _, g in events] == ["next"]
+
+
+def test_low_confidence_frames_count_as_no_gesture():
+    debouncer = GestureDebouncer(min_confidence=0.7)
+    assert feed(debouncer, ["next"] * 10, confidence=0.5) == []
+
+
+def test_release_emits_no_gesture_once():
+    events = feed(GestureDebouncer(), ["next"] * 10 + [NO_GESTURE] * 10)
+    assert [g for _, g in events] == ["next", NO_GESTURE]
+
+
+def test_gesture_winning_during_cooldown_is_emitted_after_it():
+    debouncer = GestureDebouncer(cooldown=0.75)
+    events = feed(debouncer, ["next"] * 10 + ["prev"] * 10)
+
+    assert [g for _, g in events] == ["next", "prev"]
+    (next_at, _), (prev_at, _) = events
+    assert prev_at - next_at >= 0.75
+    assert debouncer.active == "prev"
+
+
+def test_gesture_released_during_cooldown_is_not_emitted():
+    debouncer = GestureDebouncer(cooldown=2.0)
+    events = feed(debouncer, ["next"] * 5 + ["prev"] * 5 + [NO_GESTURE] * 10)
+    # prev never became active, so the release belongs to next
+    assert [g for _, g in events] == ["next", NO_GESTURE]
+
+
+def test_reset_clears_active_gesture():
+    debouncer = GestureDebouncer()
+    feed(debouncer, ["next"] * 10)
+    debouncer.reset()
+    assert debouncer.active == NO_GESTURE
+    assert debouncer.update(NO_GESTURE, 0.0, now=10.0) is None
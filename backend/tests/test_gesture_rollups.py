@@ -0,0 +1,118 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from database.mongodb import STALE_ROLLUPS_ID, MongoDB
+
+
+class FakeCollection:
+    def __init__(self):
+        self.documents = {}
+        self.calls = []
+        self.error = None
+
+    async def insert_many(self, documents, ordered=True):
+        self.calls.append(documents)
+        if self.error is not None:
+            raise self.error
+
+    async def bulk_write(self, updates, ordered=True):
+        self.calls.append(updates)
+        if self.error is not None:
+            raise self.error
+
+    async def update_one(self, query, update, upsert=False):
+        self.documents[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+    async def find_one(self, query):
+        return self.documents.get(query["_id"])
+
+
+class FakeDatabase:
+    def __init__(self):
+        self.gesture_logs = FakeCollection()
+        self.gesture_rollups = FakeCollection()
+        self.maintenance = FakeCollection()
+
+
+def database():
+    db = MongoDB("mongodb://localhost:1")
+    db.db = FakeDatabase()
+    return db
+
+
+def log(gesture):
+    return {"user_id": "u1", "gesture": gesture, "confidence": 0.9, "timestamp": datetime(2026, 1, 5, 10, 30)}
+
+
+def rolled_up_counts(updates):
+    return sorted(
+        (u._filter["gesture"], u._doc["$inc"]["count"]) for u in updates if u._filter["granularity"] == "day"
+    )
+
+
+def test_inserted_logs_are_rolled_up():
+    async def run():
+        db = database()
+        await db._insert_gesture_logs([log("next"), log("next"), log("prev")])
+        return db
+    db = asyncio.run(run())
+
+    assert rolled_up_counts(db.db.gesture_rollups.calls[0]) == [("next", 2), ("prev", 1)]
+    assert STALE_ROLLUPS_ID not in db.db.maintenance.documents
+
+
+def test_only_inserted_logs_of_a_partial_batch_are_rolled_up():
+    async def run():
+        db = database()
+        db.db.gesture_logs.error = BulkWriteError({"writeErrors": [{"index": 1, "code": 11000}]})
+        with pytest.raises(BulkWriteError):
+            await db._insert_gesture_logs([log("next"), log("next"), log("prev")])
+        return db
+    db = asyncio.run(run())
+
+    assert rolled_up_counts(db.db.gesture_rollups.calls[0]) == [("next", 1), ("prev", 1)]
+
+
+def test_failed_rollup_marks_rollups_stale():
+    async def run():
+        db = database()
+        db.db.gesture_rollups.error = ConnectionError("lost connection")
+        with pytest.raises(ConnectionError):
+            await db._insert_gesture_logs([log("next")])
+        return db
+    db = asyncio.run(run())
+
+    assert STALE_ROLLUPS_ID in db.db.maintenance.documents
+
+
+def test_insert_with_unknown_outcome_marks_rollups_stale():
+    async def run():
+        db = database()
+        db.db.gesture_logs.error = ConnectionError("lost connection")
+        with pytest.raises(ConnectionError):
+            await db._insert_gesture_logs([log("next")])
+        return db
+    db = asyncio.run(run())
+
+    assert db.db.gesture_rollups.calls == []
+    assert STALE_ROLLUPS_ID in db.db.maintenance.documents
+
+
+def test_repair_only_rebuilds_stale_rollups():
+    rebuilds = []
+
+    async def rebuild():
+        rebuilds.append(True)
+
+    async def run():
+        db = database()
+        db.rebuild_gesture_rollups = rebuild
+        before = await db.repair_gesture_rollups()
+        await db._mark_rollups_stale()
+        return before, await db.repair_gesture_rollups()
+
+    assert asyncio.run(run()) == (False, True)
+    assert rebuilds == [True]
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+from utils.gesture_rules import FINGER_INDICES, RULE_GESTURES, as_points, classify, classify_batch
+
+FINGERS = ["THUMB", "INDEX", "MIDDLE", "RING", "PINKY"]
+
+
+def legacy_rule(points):
+    """The per-landmark rules the vectorized table replaced."""
+    points = points - points[0]
+    max_dist = np.max(np.linalg.norm(points, axis=1))
+    if max_dist > 0:
+        points = points / max_dist
+    thumb, index, middle, ring, pinky = (
+        points[FINGER_INDICES[finger][-1], 1] < points[FINGER_INDICES[finger][0], 1] - 0.1
+        for finger in FINGERS
+    )
+    if index and not (thumb or middle or ring or pinky):
+        return "point_right", 0.95
+    if pinky and not (thumb or index or middle or ring):
+        return "point_left", 0.95
+    if index and middle and not (thumb or ring or pinky):
+        return "draw", 0.9
+    if all([thumb, index, middle, ring, pinky]):
+        return "open_hand", 0.95
+    if not any([thumb, index, middle, ring, pinky]):
+        return "stop", 0.95
+    return "no_gesture", 0.0
+
+
+def hand(extended):
+    """Upright hand in image coordinates with the given fingers extended."""
+    points = np.zeros((21, 3), dtype=np.float32)
+    points[0] = [0.5, 0.9, 0.0]
+    for i, finger in enumerate(FINGERS):
+        indices = FINGER_INDICES[finger]
+        x = 0.3 + 0.1 * i
+        points[indices[0]] = [x, 0.6, 0.0]
+        tip_y = 0.3 if finger in extended else 0.62
+        for j, idx in enumerate(indices[1:], start=1):
+            points[idx] = [x, 0.6 + (tip_y - 0.6) * j / 3, 0.0]
+    return points
+
+
+POSES = [
+    ({"INDEX"}, "point_right"),
+    ({"PINKY"}, "point_left"),
+    ({"INDEX", "MIDDLE"}, "draw"),
+    (set(FINGERS), "open_hand"),
+    (set(), "stop"),
+    ({"THUMB", "INDEX"}, "no_gesture"),
+]
+
+
+@pytest.mark.parametrize("extended, expected", POSES)
+def test_poses_match_the_legacy_rules(extended, expected):
+    points = hand(extended)
+    gesture_idx, confidence = classify(points)
+    assert RULE_GESTURES[gesture_idx] == expected
+    assert (RULE_GESTURES[gesture_idx], float(confidence)) == pytest.approx(legacy_rule(points))
+
+
+def test_random_hands_match_the_legacy_rules():
+    points = np.random.default_rng(0).uniform(0, 1, size=(500, 21, 3)).astype(np.float32)
+    gestures, confidence = classify_batch(points)
+    expected = [legacy_rule(p) for p in points]
+    assert gestures == [gesture for gesture, _ in expected]
+    assert np.allclose(confidence, [c for _, c in expected])
+
+
+def test_batch_accepts_flat_landmarks():
+    batch = np.stack([hand(extended) for extended, _ in POSES])
+    gestures, confidence = classify_batch(batch.reshape(len(POSES), 63))
+    assert gestures == [expected for _, expected in POSES]
+    assert confidence.shape == (len(POSES),) and confidence.dtype == np.float32
+    assert as_points(batch[0].reshape(63)).shape == (21, 3)
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+
+from services.inference_batcher import InferenceBatcher
+
+
+def test_concurrent_submissions_share_a_batch():
+    batches = []
+
+    def run_batch(items):
+        batches.append(list(items))
+        return [item * 2 for item in items]
+
+    async def run():
+        batcher = InferenceBatcher(run_batch, max_batch_size=8, max_wait_ms=50)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.close()
+        return results
+
+    assert asyncio.run(run()) == [0, 2, 4, 6, 8]
+    assert batches == [[0, 1, 2, 3, 4]]
+
+
+def test_full_batches_are_split_and_flushed_without_waiting():
+    batches = []
+
+    def run_batch(items):
+        batches.append(len(items))
+        return items
+
+    async def run():
+        batcher = InferenceBatcher(run_batch, max_batch_size=4, max_wait_ms=10000)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(8))), 1)
+        await batcher.close()
+        return results
+
+    assert asyncio.run(run()) == list(range(8))
+    assert batches == [4, 4]
+
+
+def test_a_lone_item_is_flushed_after_max_wait():
+    async def run():
+        batcher = InferenceBatcher(lambda items: items, max_batch_size=16, max_wait_ms=20)
+        result = await asyncio.wait_for(batcher.submit("a"), 1)
+        stats = batcher.stats()
+        await batcher.close()
+        return result, stats
+
+    result, stats = asyncio.run(run())
+    assert result == "a"
+    assert stats["batches"] == 1 and stats["avg_wait_ms"] >= 15
+
+
+def test_errors_reach_every_item_of_the_batch():
+    def run_batch(items):
+        raise RuntimeError("model failed")
+
+    async def run():
+        batcher = InferenceBatcher(run_batch, max_batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        # The batcher keeps serving after a failed batch
+        batcher.run_batch = lambda items: items
+        after = await batcher.submit("ok")
+        await batcher.close()
+        return results, after
+
+    results, after = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert after == "ok"
+
+
+def test_close_cancels_pending_items():
+    async def run():
+        batcher = InferenceBatcher(lambda items: items, max_batch_size=16, max_wait_ms=10000)
+        pending = asyncio.create_task(batcher.submit("a"))
+        await asyncio.sleep(0.01)
+        await batcher.close()
+        with pytest.raises(asyncio.CancelledError):
+            await pending
+
+    asyncio.run(run())
@@ -0,0 +1,61 @@
+import os
+
+import numpy as np
+
+from training.landmark_dataset import (
+    NUM_FEATURES, _load_previous, _save, _save_shard, load_landmark_dataset
+)
+
+CLASSES = ["fist", "palm"]
+
+
+def rows(value, n):
+    return np.full((n, NUM_FEATURES), value, dtype=np.float32)
+
+
+def base_dataset(output_dir):
+    records = {"a.jpg": {"label": 0}, "b.jpg": {"label": 1}}
+    arrays = {"a.jpg": rows(0.1, 2), "b.jpg": rows(0.2, 1)}
+    _save(output_dir, CLASSES, records, arrays, 1)
+
+
+def test_checkpoints_write_only_new_files_to_shards(tmp_path):
+    output_dir = str(tmp_path)
+    base_dataset(output_dir)
+    records = {"c.jpg": {"label": 1}, "d.jpg": {"label": 0}}
+    arrays = {"c.jpg": rows(0.3, 3), "d.jpg": rows(0.4, 1)}
+    _save_shard(output_dir, CLASSES, records, arrays, ["c.jpg"], 1, 0)
+    _save_shard(output_dir, CLASSES, records, arrays, ["d.jpg"], 1, 1)
+
+    with np.load(os.path.join(output_dir, "landmarks_000001.shard0001.npz")) as data:
+        assert len(data["labels"]) == 1
+
+    previous, arrays, generation, next_shard = _load_previous(output_dir, CLASSES)
+    assert sorted(previous) == ["a.jpg", "b.jpg", "c.jpg", "d.jpg"]
+    assert (generation, next_shard) == (1, 2)
+    assert np.allclose(arrays["c.jpg"], 0.3, atol=1e-3) and len(arrays["c.jpg"]) == 3
+    assert np.allclose(arrays["a.jpg"], 0.1, atol=1e-3) and len(arrays["a.jpg"]) == 2
+
+
+def test_final_save_merges_shards_and_removes_them(tmp_path):
+    output_dir = str(tmp_path)
+    base_dataset(output_dir)
+    _save_shard(output_dir, CLASSES, {"c.jpg": {"label": 1}}, {"c.jpg": rows(0.3, 3)}, ["c.jpg"], 1, 0)
+
+    records, arrays, generation, _ = _load_previous(output_dir, CLASSES)
+    _save(output_dir, CLASSES, records, arrays, generation + 1)
+
+    assert sorted(os.listdir(output_dir)) == ["index.json", "landmarks_000002.npz"]
+    landmarks, labels, classes = load_landmark_dataset(output_dir)
+    assert classes == CLASSES
+    assert len(labels) == 6 and sorted(labels.tolist()) == [0, 0, 1, 1, 1, 1]
+
+
+def test_shards_of_other_classes_are_ignored(tmp_path):
+    output_dir = str(tmp_path)
+    base_dataset(output_dir)
+    _save_shard(output_dir, ["other"], {"c.jpg": {"label": 0}}, {"c.jpg": rows(0.3, 3)}, ["c.jpg"], 1, 0)
+
+    previous, _, _, next_shard = _load_previous(output_dir, CLASSES)
+    assert sorted(previous) == ["a.jpg", "b.jpg"]
+    assert next_shard == 0
@@ -0,0 +1,40 @@
+import numpy as np
+
+from utils.preprocessing import augment_batch, translate_landmarks
+
+
+def batch(shape=(16, 63)):
+    return np.random.default_rng(0).uniform(-1, 1, shape).astype(np.float32)
+
+
+def test_same_seed_gives_the_same_augmentations():
+    landmarks = batch()
+    first = augment_batch(landmarks, np.random.default_rng(7))
+    second = augment_batch(landmarks, np.random.default_rng(7))
+    other = augment_batch(landmarks, np.random.default_rng(8))
+    assert np.array_equal(first, second)
+    assert not np.array_equal(first, other)
+
+
+def test_augment_batch_keeps_the_shape_and_input():
+    for shape in [(16, 63), (16, 21, 3)]:
+        landmarks = batch(shape)
+        original = landmarks.copy()
+        augmented = augment_batch(landmarks, np.random.default_rng(0))
+        assert augmented.shape == shape and augmented.dtype == np.float32
+        assert np.array_equal(landmarks, original)
+
+
+def test_augment_probability():
+    landmarks = batch()
+    assert np.array_equal(augment_batch(landmarks, np.random.default_rng(0), p=0.0), landmarks)
+    changed = ~np.isclose(augment_batch(landmarks, np.random.default_rng(0), p=1.0), landmarks).all(axis=1)
+    assert changed.all()
+
+
+def test_translate_landmarks_copies_its_input():
+    landmarks = batch((63,))
+    original = landmarks.copy()
+    translated = translate_landmarks(landmarks, 0.1, -0.2)
+    assert np.array_equal(landmarks, original)
+    assert np.allclose(translated.reshape(21, 3) - original.reshape(21, 3), [0.1, -0.2, 0.0])
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import shutil
+
+import fitz
+import pytest
+from pptx import Presentation
+
+from config.settings import settings
+from services.presentation_service import PresentationService
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "UPLOAD_DIR", str(tmp_path / "uploads"))
+    monkeypatch.setattr(settings, "SLIDE_CACHE_DIR", "")
+    monkeypatch.setattr(settings, "SEARCH_INDEX_PATH", "")
+    monkeypatch.setattr(settings, "RENDER_WORKERS", 1)
+    yield PresentationService()
+    if PresentationService._render_pool is not None:
+        PresentationService._render_pool.shutdown()
+        PresentationService._render_pool = None
+
+
+def upload(tmp_path, name, build):
+    path = str(tmp_path / name)
+    build(path)
+    return path
+
+
+def pdf(path, pages=3):
+    with fitz.open() as document:
+        for i in range(pages):
+            document.new_page().insert_text((72, 72), f"page {i + 1}")
+        document.save(path)
+
+
+def pptx(path, slides=3):
+    presentation = Presentation()
+    for i in range(slides):
+        presentation.slides.add_slide(presentation.slide_layouts[5]).shapes.title.text = f"slide {i + 1}"
+    presentation.save(path)
+
+
+def deck_files(service, key):
+    return os.listdir(service.cache.deck_dir(key))
+
+
+@pytest.mark.parametrize("name, build", [("deck.pdf", pdf), ("deck.pptx", pptx)])
+def test_stream_closed_before_iteration_releases_the_deck(service, tmp_path, name, build):
+    first = upload(tmp_path, f"a_{name}", build)
+    second = shutil.copy(first, tmp_path / f"b_{name}")
+
+    async def run():
+        key, total, slides = await service.stream_presentation(first, name)
+        # What a response cancelled before it started iterating does
+        await slides.aclose()
+
+        # A second upload of the same file is served from the cache instead of hanging
+        again = await asyncio.wait_for(
+            service.process_presentation(str(second), name), 60
+        )
+        return key, total, again
+
+    key, total, again = asyncio.run(run())
+    assert again["deck_id"] == key
+    assert len(again["slides"]) == total == 3
+    assert key not in service._rendering
+    assert not any(f.startswith("source.") for f in deck_files(service, key))
+
+
+def test_stream_yields_slides_in_order(service, tmp_path):
+    async def run():
+        _, total, slides = await service.stream_presentation(upload(tmp_path, "deck.pdf", lambda p: pdf(p, 6)), "deck.pdf")
+        return total, [slide["number"] async for slide in slides]
+
+    total, numbers = asyncio.run(run())
+    assert numbers == list(range(1, total + 1)) and total == 6
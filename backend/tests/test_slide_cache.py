@@ -0,0 +1,63 @@
+import os
+
+from services.slide_cache import SlideCache
+
+
+def render(cache, key, size):
+    deck_dir = cache.prepare(key)
+    with open(os.path.join(deck_dir, "slide_1_screen.webp"), "wb") as f:
+        f.write(b"x" * size)
+    cache.store(key, {"slides": []})
+
+
+def key(n):
+    return f"{n:032x}"
+
+
+def test_sizes_are_tracked_without_rescanning(tmp_path, monkeypatch):
+    cache = SlideCache(str(tmp_path), max_bytes=10 ** 6)
+    render(cache, key(1), 1000)
+    render(cache, key(2), 2000)
+
+    monkeypatch.setattr(cache, "_scan", lambda: (_ for _ in ()).throw(AssertionError("walked the cache")))
+    stats = cache.stats()
+    assert stats["decks"] == 2
+    assert 3000 < stats["bytes"] < 3200
+    assert SlideCache(str(tmp_path), max_bytes=10 ** 6).bytes == stats["bytes"]
+
+
+def test_least_recently_used_decks_are_evicted(tmp_path):
+    cache = SlideCache(str(tmp_path), max_bytes=2500)
+    evicted = []
+    cache.on_evict = evicted.append
+    render(cache, key(1), 1000)
+    render(cache, key(2), 1000)
+    cache.load(key(1))
+    render(cache, key(3), 1000)
+
+    assert evicted == [key(2)]
+    assert not os.path.exists(cache.deck_dir(key(2)))
+    assert cache.stats()["decks"] == 2
+    assert cache.bytes <= 2500
+
+
+def test_slides_rendered_on_demand_count_towards_the_size(tmp_path):
+    cache = SlideCache(str(tmp_path), max_bytes=10 ** 6)
+    render(cache, key(1), 0)
+    before = cache.bytes
+    image = os.path.join(cache.deck_dir(key(1)), "slide_2_screen.webp")
+    with open(image, "wb") as f:
+        f.write(b"x" * 500)
+    cache.store_slide(key(1), 2, {"number": 2, "images": {"screen": {"path": image}}})
+
+    assert cache.bytes - before > 500
+
+
+def test_decks_still_rendering_are_not_evicted(tmp_path):
+    cache = SlideCache(str(tmp_path), max_bytes=500)
+    cache.prepare(key(1))
+    render(cache, key(2), 1000)
+    render(cache, key(3), 1000)
+
+    assert os.path.isdir(cache.deck_dir(key(1)))
+    assert not os.path.exists(cache.deck_dir(key(2)))
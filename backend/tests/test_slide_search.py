@@ -0,0 +1,58 @@
+from services.slide_search import SlideSearchIndex
+
+
+def manifest(deck_id, texts, filename="deck.pdf"):
+    return {
+        "deck_id": deck_id,
+        "filename": filename,
+        "slides": [{"number": i, "text_content": text} for i, text in enumerate(texts, start=1)]
+    }
+
+
+def test_results_are_limited_to_the_owner(tmp_path):
+    index = SlideSearchIndex(str(tmp_path / "search.json"))
+    index.add_deck("alice", manifest("d1", ["quarterly revenue", "team photo"]))
+    index.add_deck("bob", manifest("d2", ["revenue forecast"]))
+
+    assert [(r["deck_id"], r["number"]) for r in index.search("alice", "revenue")] == [("d1", 1)]
+    assert [r["deck_id"] for r in index.search("bob", "revenue")] == ["d2"]
+    assert index.search("mallory", "revenue") == []
+
+
+def test_every_term_must_match_and_last_term_is_a_prefix(tmp_path):
+    index = SlideSearchIndex(str(tmp_path / "search.json"))
+    index.add_deck("alice", manifest("d1", ["gesture recognition demo", "gesture library", "recognition only"]))
+
+    assert [r["number"] for r in index.search("alice", "gesture recog")] == [1]
+    assert sorted(r["number"] for r in index.search("alice", "gest")) == [1, 2]
+    assert index.search("alice", "gesture missing") == []
+
+
+def test_rarer_terms_score_higher(tmp_path):
+    index = SlideSearchIndex(str(tmp_path / "search.json"))
+    index.add_deck("alice", manifest("d1", ["slide common", "slide common", "slide rare"]))
+    results = index.search("alice", "slide")
+    assert len(results) == 3
+    assert index.search("alice", "rare")[0]["score"] > index.search("alice", "common")[0]["score"]
+
+
+def test_deck_filter_and_removal(tmp_path):
+    index = SlideSearchIndex(str(tmp_path / "search.json"))
+    index.add_deck("alice", manifest("d1", ["budget"]))
+    index.add_deck("alice", manifest("d2", ["budget"]))
+
+    assert [r["deck_id"] for r in index.search("alice", "budget", deck_id="d2")] == ["d2"]
+    index.remove_deck("d1")
+    assert [r["deck_id"] for r in index.search("alice", "budget")] == ["d2"]
+    assert index.stats()["decks"] == 1
+
+
+def test_load_rebuilds_from_manifests(tmp_path):
+    path = str(tmp_path / "search.json")
+    manifests = {"d1": manifest("d1", ["roadmap"])}
+    index = SlideSearchIndex(path)
+    index.add_deck("alice", manifests["d1"])
+
+    reloaded = SlideSearchIndex(path)
+    reloaded.load(manifests.get)
+    assert [r["deck_id"] for r in reloaded.search("alice", "roadmap")] == ["d1"]
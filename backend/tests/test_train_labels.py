@@ -0,0 +1,19 @@
+import numpy as np
+import pytest
+
+from models.gesture_model import GESTURE_MAP
+from training.train import gesture_label_map
+
+
+def test_sorted_folder_names_map_to_gesture_indices():
+    classes = sorted(GESTURE_MAP.values())
+    label_map = gesture_label_map(classes)
+    assert [GESTURE_MAP[idx] for idx in label_map] == classes
+
+    # A subset of the gestures keeps the server's indices too
+    assert gesture_label_map(["peace", "point_left"]).tolist() == [6, 1]
+
+
+def test_unknown_classes_are_rejected():
+    with pytest.raises(ValueError, match="thumbs_up"):
+        gesture_label_map(["peace", "thumbs_up"])
@@ -0,0 +1,152 @@
+import time
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from config.settings import settings
+from models.gesture_model import GESTURE_MAP, create_model
+from services.model_registry import user_head_path
+from services.training_jobs import TrainingJobQueue, classifier_parameters, fine_tune_head, random_hands
+from training.export import export_model
+from training.landmark_dataset import _save
+
+BASE_CLASSES = [GESTURE_MAP[idx] for idx in range(len(GESTURE_MAP))]
+
+
+def hands(center, n, rng):
+    points = center + 0.15 * rng.normal(size=(n, 21, 3))
+    points -= points.mean(axis=1, keepdims=True)
+    points /= np.abs(points).max(axis=(1, 2), keepdims=True)
+    return points.reshape(n, -1).astype(np.float32)
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    """Base model trained on 10 synthetic hand shapes, plus an 11th shape for the user."""
+    monkeypatch.setattr(settings, "MODEL_PATH", str(tmp_path / "model"))
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(11, 21, 3))
+    base_x = np.concatenate([hands(centers[c], 200, rng) for c in range(10)])
+    base_y = np.repeat(np.arange(10), 200)
+
+    torch.manual_seed(0)
+    model = create_model("landmark")
+    optimizer = torch.optim.Adam(model.parameters(), lr=0.01)
+    for _ in range(150):
+        optimizer.zero_grad()
+        F.cross_entropy(model(torch.from_numpy(base_x)), torch.from_numpy(base_y)).backward()
+        optimizer.step()
+    model.eval()
+    model_path = str(tmp_path / "base.pth")
+    torch.save(model.state_dict(), model_path)
+
+    replay_dir = tmp_path / "replay"
+    replay_dir.mkdir()
+    records = {f"class_{c}": {"label": c} for c in range(10)}
+    arrays = {f"class_{c}": hands(centers[c], 200, rng) for c in range(10)}
+    _save(str(replay_dir), BASE_CLASSES, records, arrays, 1)
+    return model, model_path, str(replay_dir), centers, rng
+
+
+def load_head(user_id):
+    checkpoint = torch.load(user_head_path(user_id))
+    out_features, in_features = checkpoint["state_dict"]["weight"].shape
+    head = nn.Linear(in_features, out_features)
+    head.load_state_dict(checkpoint["state_dict"])
+    return head, checkpoint["classes"]
+
+
+def test_custom_gesture_keeps_base_gestures(setup):
+    model, model_path, replay_dir, centers, rng = setup
+    classes = BASE_CLASSES + ["zoom_in"]
+    fine_tune_head(
+        "job", {}, model_path, "state_dict", hands(centers[10], 90, rng), np.full(90, 10), classes,
+        user_id="u1", num_epochs=400, learning_rate=0.05, replay_path=replay_dir
+    )
+    head, saved_classes = load_head("u1")
+    assert saved_classes == classes
+
+    def predict(x):
+        with torch.no_grad():
+            return head(model.features(torch.from_numpy(x))).argmax(1).numpy()
+
+    unrelated = random_hands(np.random.default_rng(1), 200)
+    assert (predict(unrelated) == 10).mean() < 0.05
+
+    base_x = np.concatenate([hands(centers[c], 20, rng) for c in range(10)])
+    assert (predict(base_x) == np.repeat(np.arange(10), 20)).mean() > 0.95
+
+    assert (predict(hands(centers[10], 50, rng)) == 10).mean() > 0.9
+
+
+def test_head_trains_every_custom_gesture(setup):
+    model, model_path, _, centers, rng = setup
+    landmarks = np.concatenate([hands(centers[10], 60, rng), hands(-centers[10], 60, rng)])
+    labels = np.repeat([10, 11], 60)
+    result = fine_tune_head(
+        "job", {}, model_path, "state_dict", landmarks, labels, BASE_CLASSES + ["zoom_in", "zoom_out"],
+        user_id="u2", num_epochs=400, learning_rate=0.05
+    )
+    head, classes = load_head("u2")
+    assert classes[-2:] == ["zoom_in", "zoom_out"]
+    assert result["classes"] == classes
+    with torch.no_grad():
+        predicted = head(model.features(torch.from_numpy(landmarks))).argmax(1).numpy()
+    assert (predicted == labels).mean() > 0.9
+
+
+def test_base_rows_are_the_frozen_base_classifier(setup):
+    model, model_path, _, centers, rng = setup
+    fine_tune_head(
+        "job", {}, model_path, "state_dict", hands(centers[10], 90, rng), np.full(90, 10),
+        BASE_CLASSES + ["zoom_in"], user_id="u3", num_epochs=400, learning_rate=0.05
+    )
+    head, _ = load_head("u3")
+    assert torch.equal(head.weight[:10], model.classifier.weight)
+    assert torch.equal(head.bias[:10], model.classifier.bias)
+
+    # Without replay data, base gestures are still recognized as the base model does
+    base_x = np.concatenate([hands(centers[c], 20, rng) for c in range(10)])
+    with torch.no_grad():
+        features = model.features(torch.from_numpy(base_x))
+        assert (head(features).argmax(1) == model.classifier(features).argmax(1)).float().mean() > 0.95
+
+
+def test_classifier_parameters_of_int8_models(setup, tmp_path):
+    model, model_path, _, _, _ = setup
+    artifacts = export_model("landmark", model_path, str(tmp_path))
+    weight, bias = classifier_parameters(torch.jit.load(artifacts["int8"]).classifier)
+    assert torch.allclose(weight, model.classifier.weight, atol=0.01)
+    assert torch.allclose(bias, model.classifier.bias)
+
+
+def finished_queue(finished_ttl=3600.0, max_finished=1000):
+    queue = TrainingJobQueue(finished_ttl=finished_ttl, max_finished=max_finished)
+    queue._progress = {}
+    for i in range(3):
+        job_id = f"job{i}"
+        queue.jobs[job_id] = {"job_id": job_id, "user_id": "u1", "status": "running"}
+        future = Future()
+        future.set_result({"loss": 0.1})
+        queue._finish(job_id, future)
+    return queue
+
+
+def test_finished_jobs_expire(monkeypatch):
+    queue = finished_queue(finished_ttl=60)
+    assert queue.get("job0")["status"] == "completed"
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert queue.get("job0") is None
+    assert queue.jobs == {}
+
+
+def test_only_the_newest_finished_jobs_are_kept():
+    queue = finished_queue(max_finished=2)
+    assert queue.get("job0") is None
+    assert queue.get("job1") is not None and queue.get("job2") is not None
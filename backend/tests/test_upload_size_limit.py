@@ -0,0 +1,54 @@
+from fastapi import FastAPI, File, Request, UploadFile
+from fastapi.testclient import TestClient
+
+from utils.uploads import UploadSizeLimit
+
+
+def client(max_bytes=1000):
+    app = FastAPI()
+    app.add_middleware(UploadSizeLimit, paths=["/upload", "/raw"], max_bytes=max_bytes)
+    calls = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        calls.append(file.filename)
+        return {"size": len(await file.read())}
+
+    @app.post("/raw")
+    async def raw(request: Request):
+        return {"size": len(await request.body())}
+
+    @app.post("/other")
+    async def other(request: Request):
+        return {"size": len(await request.body())}
+
+    return TestClient(app), calls
+
+
+def test_small_uploads_pass():
+    c, calls = client()
+    assert c.post("/upload", files={"file": ("a.pdf", b"x" * 500)}).json() == {"size": 500}
+    assert c.post("/raw", content=b"x" * 500).json() == {"size": 500}
+    assert calls == ["a.pdf"]
+
+
+def test_oversized_multipart_upload_is_rejected_before_the_endpoint():
+    c, calls = client()
+    response = c.post("/upload", files={"file": ("a.pdf", b"x" * 5000)})
+    assert response.status_code == 413
+    assert calls == []
+
+
+def test_oversized_body_without_content_length_is_cut_off():
+    c, _ = client()
+
+    def chunks():
+        for _ in range(10):
+            yield b"x" * 400
+
+    assert c.post("/raw", content=chunks()).status_code == 413
+
+
+def test_other_paths_are_not_limited():
+    c, _ = client()
+    assert c.post("/other", content=b"x" * 5000).json() == {"size": 5000}
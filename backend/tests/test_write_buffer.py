@@ -0,0 +1,101 @@
+import asyncio
+
+from database.write_buffer import WriteBehindBuffer
+
+
+def test_full_batches_are_written_without_waiting_for_the_interval():
+    batches = []
+
+    async def write(batch):
+        batches.append(list(batch))
+
+    async def run():
+        buffer = WriteBehindBuffer(write, max_batch_size=3, flush_interval=60)
+        for i in range(6):
+            await buffer.add(i)
+        await asyncio.sleep(0.05)
+        return list(batches)
+
+    assert asyncio.run(run()) == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_partial_batch_is_written_after_the_interval():
+    batches = []
+
+    async def write(batch):
+        batches.append(list(batch))
+
+    async def run():
+        buffer = WriteBehindBuffer(write, max_batch_size=100, flush_interval=0.05)
+        await buffer.add("a")
+        await asyncio.sleep(0.01)
+        before = list(batches)
+        await asyncio.sleep(0.1)
+        await buffer.close()
+        return before
+
+    assert asyncio.run(run()) == []
+    assert batches == [["a"]]
+
+
+def test_close_writes_everything_buffered():
+    written = []
+
+    async def write(batch):
+        written.extend(batch)
+
+    async def run():
+        buffer = WriteBehindBuffer(write, max_batch_size=4, flush_interval=60)
+        for i in range(10):
+            await buffer.add(i)
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert written == list(range(10))
+    assert stats["written"] == 10 and stats["depth"] == 0
+
+
+def test_failed_batches_are_counted_as_dropped():
+    async def write(batch):
+        raise ConnectionError("lost connection")
+
+    async def run():
+        buffer = WriteBehindBuffer(write, max_batch_size=2, flush_interval=60)
+        for i in range(3):
+            await buffer.add(i)
+        await buffer.close()
+        return buffer.stats()
+
+    stats = asyncio.run(run())
+    assert stats["dropped"] == 3 and stats["written"] == 0
+
+
+def test_add_blocks_while_the_buffer_is_full():
+    async def run():
+        gate = asyncio.Event()
+        written = []
+
+        async def write(batch):
+            await gate.wait()
+            written.extend(batch)
+
+        buffer = WriteBehindBuffer(write, max_batch_size=2, flush_interval=60, max_pending=2)
+        await buffer.add(0)
+        await buffer.add(1)
+        await asyncio.sleep(0.01)
+        # The first batch is being written; two more fill the buffer again
+        await buffer.add(2)
+        await buffer.add(3)
+        blocked = asyncio.create_task(buffer.add(4))
+        await asyncio.sleep(0.01)
+        was_blocked = not blocked.done()
+        gate.set()
+        await blocked
+        await buffer.close()
+        return was_blocked, written, buffer.blocked
+
+    was_blocked, written, blocked_count = asyncio.run(run())
+    assert was_blocked
+    assert written == [0, 1, 2, 3, 4]
+    assert blocked_count == 1
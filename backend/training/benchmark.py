@@ -0,0 +1,95 @@
+import os
+import time
+import numpy as np
+import torch
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.gesture_model import MODEL_FORMATS, load_gesture_model, model_artifact_path
+from torch.utils.data import DataLoader, TensorDataset
+from training.dataset_cache import ShardedImageDataset, normalize_images
+from training.train import prepare_data, prepare_landmark_data
+
+def measure_latency(model, example, iterations=200, warmup=20):
+    """Per-call latency in milliseconds (mean, p95)"""
+    timings = []
+    with torch.no_grad():
+        for i in range(warmup + iterations):
+            start = time.perf_counter()
+            model(example)
+            if i >= warmup:
+                timings.append((time.perf_counter() - start) * 1000)
+    return float(np.mean(timings)), float(np.percentile(timings, 95))
+
+def model_inputs(inputs):
+    return normalize_images(inputs) if inputs.dtype == torch.uint8 else inputs
+
+def predict(model, dataset, batch_size=256):
+    predictions = []
+    with torch.no_grad():
+        for inputs, _ in DataLoader(dataset, batch_size=batch_size):
+            outputs = model(model_inputs(inputs))
+            predictions.append(outputs.argmax(1))
+    return torch.cat(predictions)
+
+def benchmark(model_type, data_dir, artifacts, num_threads=None):
+    """Compare latency and accuracy of each model format on a held-out set"""
+    if num_threads:
+        torch.set_num_threads(num_threads)
+
+    if model_type == 'landmark':
+        inputs, labels, _ = prepare_landmark_data(data_dir)
+        dataset = TensorDataset(torch.from_numpy(inputs), torch.from_numpy(labels))
+    else:
+        cache = prepare_data(data_dir)
+        dataset = ShardedImageDataset(cache)
+        labels = cache.labels
+    labels = torch.as_tensor(labels)
+    example = model_inputs(dataset[0][0].unsqueeze(0))
+
+    results = {}
+    reference = None
+    for model_format, path in artifacts.items():
+        model = load_gesture_model(path, model_type=model_type, model_format=model_format)
+        predicted = predict(model, dataset)
+        if reference is None:
+            reference = predicted
+        mean_ms, p95_ms = measure_latency(model, example)
+        results[model_format] = {
+            'size_kb': os.path.getsize(path) / 1024,
+            'latency_ms': mean_ms,
+            'latency_p95_ms': p95_ms,
+            'accuracy': predicted.eq(labels).float().mean().item(),
+            'agreement': predicted.eq(reference).float().mean().item()
+        }
+
+    print(f'{len(labels)} held-out samples')
+    print(f'{"format":<12}{"size KB":>10}{"mean ms":>10}{"p95 ms":>10}{"acc %":>9}{"agree %":>9}')
+    for model_format, r in results.items():
+        print(f'{model_format:<12}{r["size_kb"]:>10.1f}{r["latency_ms"]:>10.3f}{r["latency_p95_ms"]:>10.3f}'
+              f'{100 * r["accuracy"]:>9.2f}{100 * r["agreement"]:>9.2f}')
+    return results
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Benchmark exported gesture models against fp32')
+    parser.add_argument('--data_dir', type=str, required=True, help='Path to held-out data directory')
+    parser.add_argument('--model', type=str, default='landmark', choices=['landmark', 'cnn'],
+                        help='Landmark MLP or image CNN')
+    parser.add_argument('--model_dir', type=str, default=None,
+                        help='Directory holding the trained and exported files')
+    parser.add_argument('--threads', type=int, default=None, help='Torch CPU threads')
+
+    args = parser.parse_args()
+
+    artifacts = {}
+    for model_format in MODEL_FORMATS:
+        path = model_artifact_path(args.model, model_format)
+        if args.model_dir:
+            path = os.path.join(args.model_dir, os.path.basename(path))
+        if os.path.exists(path):
+            artifacts[model_format] = path
+        else:
+            print(f'Skipping {model_format}: {path} not found')
+
+    benchmark(args.model, args.data_dir, artifacts, args.threads)
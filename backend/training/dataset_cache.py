@@ -0,0 +1,146 @@
+import os
+import json
+import hashlib
+import cv2
+import numpy as np
+import torch
+from torch.utils.data import Dataset
+from tqdm import tqdm
+
+INDEX_NAME = "index.json"
+CACHE_VERSION = 1
+
+def list_images(data_dir):
+    """(path, label index) of every file under data_dir/<class>/, and the sorted class names"""
+    classes = [
+        c for c in sorted(os.listdir(data_dir))
+        if os.path.isdir(os.path.join(data_dir, c)) and not c.startswith(".")
+    ]
+    files = []
+    for label_idx, class_name in enumerate(classes):
+        class_dir = os.path.join(data_dir, class_name)
+        for img_name in sorted(os.listdir(class_dir)):
+            files.append((os.path.join(class_dir, img_name), label_idx))
+    return files, classes
+
+def fingerprint(files, img_size):
+    """Changes whenever a source image is added, removed or modified"""
+    digest = hashlib.sha256(json.dumps(list(img_size)).encode())
+    for path, label_idx in files:
+        stat = os.stat(path)
+        digest.update(f"{path}\0{label_idx}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+    return digest.hexdigest()
+
+def build_image_cache(data_dir, cache_dir, img_size=(224, 224), shard_size=1024):
+    """Decode and resize every image once into uint8 CHW .npy shards plus an index"""
+    files, classes = list_images(data_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    width, height = img_size
+
+    shards = []
+    labels = []
+    for shard_idx, start in enumerate(range(0, len(files), shard_size)):
+        chunk = files[start:start + shard_size]
+        name = f"images_{shard_idx:05d}.npy"
+        shard = np.lib.format.open_memmap(
+            os.path.join(cache_dir, name), mode="w+", dtype=np.uint8, shape=(len(chunk), 3, height, width)
+        )
+        count = 0
+        for img_path, label_idx in tqdm(chunk, desc=f"Caching shard {shard_idx}"):
+            try:
+                img = cv2.imread(img_path)
+                if img is None:
+                    continue
+                img = cv2.resize(img, img_size)
+                shard[count] = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).transpose((2, 0, 1))
+                labels.append(label_idx)
+                count += 1
+            except Exception as e:
+                print(f"Error processing {img_path}: {e}")
+        shard.flush()
+        del shard
+        # Rows past count belong to unreadable images and are never indexed
+        shards.append({"file": name, "count": count})
+
+    np.save(os.path.join(cache_dir, "labels.npy"), np.array(labels, dtype=np.int64))
+    index = {
+        "version": CACHE_VERSION,
+        "fingerprint": fingerprint(files, img_size),
+        "classes": classes,
+        "img_size": list(img_size),
+        "dtype": "uint8",
+        "shards": shards
+    }
+    # Written last: a cache without an index is incomplete
+    with open(os.path.join(cache_dir, f"{INDEX_NAME}.tmp"), "w") as f:
+        json.dump(index, f)
+    os.replace(os.path.join(cache_dir, f"{INDEX_NAME}.tmp"), os.path.join(cache_dir, INDEX_NAME))
+
+def cache_is_current(data_dir, cache_dir, img_size):
+    try:
+        with open(os.path.join(cache_dir, INDEX_NAME)) as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return False
+    files, _ = list_images(data_dir)
+    return (index.get("version") == CACHE_VERSION
+            and index.get("fingerprint") == fingerprint(files, img_size))
+
+class ImageShardCache:
+    """Read-only view of a shard set; shards are memory-mapped on first access"""
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        with open(os.path.join(cache_dir, INDEX_NAME)) as f:
+            self.index = json.load(f)
+        self.classes = self.index["classes"]
+        self.labels = np.load(os.path.join(cache_dir, "labels.npy"))
+
+        counts = [shard["count"] for shard in self.index["shards"]]
+        self.shard_of = np.repeat(np.arange(len(counts)), counts)
+        self.row_of = np.concatenate([np.arange(c) for c in counts]) if counts else np.zeros(0, dtype=np.int64)
+        self._shards = [None] * len(counts)
+
+    def __len__(self):
+        return len(self.labels)
+
+    def __getstate__(self):
+        # DataLoader workers map the shards themselves instead of receiving copies
+        state = self.__dict__.copy()
+        state["_shards"] = [None] * len(self._shards)
+        return state
+
+    def _shard(self, shard_idx):
+        if self._shards[shard_idx] is None:
+            path = os.path.join(self.cache_dir, self.index["shards"][shard_idx]["file"])
+            self._shards[shard_idx] = np.load(path, mmap_mode="r")
+        return self._shards[shard_idx]
+
+    def image(self, idx):
+        """uint8 CHW image; only its pages are read from disk"""
+        return self._shard(self.shard_of[idx])[self.row_of[idx]]
+
+class ShardedImageDataset(Dataset):
+    """Images of a shard cache as uint8 tensors; normalize batches with normalize_images
+
+    label_map, if given, maps the cache's labels to the labels returned.
+    """
+
+    def __init__(self, cache, indices=None, label_map=None):
+        self.cache = cache
+        self.indices = np.arange(len(cache)) if indices is None else np.asarray(indices)
+        self.label_map = label_map
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, idx):
+        i = self.indices[idx]
+        label = self.cache.labels[i]
+        if self.label_map is not None:
+            label = self.label_map[label]
+        return torch.from_numpy(np.array(self.cache.image(i))), int(label)
+
+def normalize_images(inputs):
+    """uint8 image batch to the float [0, 1] input the CNN expects"""
+    return inputs.float().div_(255.0)
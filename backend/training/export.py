@@ -0,0 +1,51 @@
+import os
+import torch
+import torch.nn as nn
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.gesture_model import (
+    MODEL_INPUT_SHAPES, PRETRAINED_MODEL_PATHS, create_model, model_artifact_path
+)
+
+def quantize_model(model):
+    """Dynamically quantize the Linear layers of a model to int8"""
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+def export_model(model_type='landmark', weights_path=None, output_dir=None, num_classes=10):
+    """Write TorchScript and int8 TorchScript artifacts of a trained model"""
+    weights_path = weights_path or PRETRAINED_MODEL_PATHS[model_type]
+    model = create_model(model_type, num_classes)
+    model.load_state_dict(torch.load(weights_path, map_location='cpu'))
+    model.eval()
+
+    example = torch.randn(1, *MODEL_INPUT_SHAPES[model_type])
+    artifacts = {}
+
+    with torch.no_grad():
+        for model_format, exported in [('torchscript', model), ('int8', quantize_model(model))]:
+            path = model_artifact_path(model_type, model_format)
+            if output_dir:
+                path = os.path.join(output_dir, os.path.basename(path))
+            # Not frozen: freezing inlines features and classifier, which user heads run separately
+            traced = torch.jit.trace(exported, example)
+            torch.jit.save(traced, path)
+            artifacts[model_format] = path
+            print(f'Saved {model_format} model to {path} ({os.path.getsize(path) / 1024:.1f} KB)')
+
+    return artifacts
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Export gesture recognition model for CPU inference')
+    parser.add_argument('--model', type=str, default='landmark', choices=['landmark', 'cnn'],
+                        help='Landmark MLP or image CNN')
+    parser.add_argument('--weights', type=str, default=None,
+                        help='Trained state_dict (defaults to the pretrained model path)')
+    parser.add_argument('--output_dir', type=str, default=None,
+                        help='Directory for the exported files (defaults to next to the pretrained model)')
+
+    args = parser.parse_args()
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+    export_model(args.model, args.weights, args.output_dir)
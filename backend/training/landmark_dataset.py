@@ -0,0 +1,282 @@
+import os
+import re
+import json
+import hashlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import cv2
+import numpy as np
+from tqdm import tqdm
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.preprocessing import preprocess_landmarks
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+VIDEO_EXTENSIONS = {'.mp4', '.avi', '.mov', '.mkv', '.webm'}
+INDEX_NAME = 'index.json'
+DATASET_VERSION = 1
+# Normalized landmarks lie in [-1, 1]; float16 keeps about 3 decimals at half the size
+STORAGE_DTYPE = np.float16
+NUM_FEATURES = 63
+# Files extracted since the last checkpoint, on top of landmarks_<generation>.npz
+SHARD_PATTERN = re.compile(r'^landmarks_(\d{6})\.shard(\d{4})\.npz$')
+
+# MediaPipe Hands of the current worker process
+_hands = None
+
+def _init_worker():
+    global _hands
+    import mediapipe as mp
+    _hands = mp.solutions.hands.Hands(static_image_mode=True, max_num_hands=1)
+
+def _landmarks(img):
+    results = _hands.process(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+    if not results.multi_hand_landmarks:
+        return None
+    return preprocess_landmarks(results.multi_hand_landmarks[0])
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def extract_file(path, frame_step=5):
+    """Landmark rows of an image, or of every frame_step-th frame of a video, and the file hash; runs in a worker"""
+    rows = []
+    if os.path.splitext(path)[1].lower() in VIDEO_EXTENSIONS:
+        capture = cv2.VideoCapture(path)
+        frame_idx = 0
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            if frame_idx % frame_step == 0:
+                points = _landmarks(frame)
+                if points is not None:
+                    rows.append(points)
+            frame_idx += 1
+        capture.release()
+    else:
+        img = cv2.imread(path)
+        if img is not None:
+            points = _landmarks(img)
+            if points is not None:
+                rows.append(points)
+    landmarks = np.array(rows, dtype=np.float32).reshape(-1, NUM_FEATURES)
+    return landmarks, file_sha256(path)
+
+def list_sources(data_dir):
+    """(relative path, label index) of every image and video under data_dir/<class>/, and the class names"""
+    classes = [
+        c for c in sorted(os.listdir(data_dir))
+        if os.path.isdir(os.path.join(data_dir, c)) and not c.startswith('.')
+    ]
+    sources = []
+    for label_idx, class_name in enumerate(classes):
+        for root, _, names in os.walk(os.path.join(data_dir, class_name)):
+            for name in sorted(names):
+                if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS | VIDEO_EXTENSIONS:
+                    sources.append((os.path.relpath(os.path.join(root, name), data_dir), label_idx))
+    return sorted(sources), classes
+
+def _read_index(output_dir):
+    with open(os.path.join(output_dir, INDEX_NAME)) as f:
+        return json.load(f)
+
+def load_landmark_dataset(output_dir):
+    """(N, 63) float32 landmarks, N labels and the class names of a built dataset"""
+    index = _read_index(output_dir)
+    with np.load(os.path.join(output_dir, index['data_file'])) as data:
+        return data['landmarks'].astype(np.float32), data['labels'], index['classes']
+
+def _pack(records, arrays, files):
+    """Landmark and label arrays of files, setting each record's offset and rows"""
+    offset = 0
+    for f in files:
+        records[f]['offset'] = offset
+        records[f]['rows'] = len(arrays[f])
+        offset += len(arrays[f])
+
+    landmarks = np.zeros((offset, NUM_FEATURES), dtype=STORAGE_DTYPE)
+    labels = np.zeros(offset, dtype=np.int64)
+    for f in files:
+        rows = slice(records[f]['offset'], records[f]['offset'] + records[f]['rows'])
+        landmarks[rows] = arrays[f]
+        labels[rows] = records[f]['label']
+    return landmarks, labels
+
+def _shard_files(output_dir):
+    """(generation, number, name) of every checkpoint shard in output_dir, in order"""
+    shards = []
+    for name in os.listdir(output_dir):
+        match = SHARD_PATTERN.match(name)
+        if match:
+            shards.append((int(match.group(1)), int(match.group(2)), name))
+    return sorted(shards)
+
+def _save_shard(output_dir, classes, records, arrays, files, generation, number):
+    """Write the files extracted since the last checkpoint to a shard of their own
+
+    Checkpoints only write what is new; the shards are merged into one
+    data file by _save at the end of the build. A shard is renamed into
+    place once complete, so an interrupted write leaves no partial shard.
+    """
+    shard_records = {f: dict(records[f]) for f in files}
+    landmarks, labels = _pack(shard_records, arrays, sorted(files))
+    meta = {'version': DATASET_VERSION, 'classes': classes, 'files': shard_records}
+    name = f'landmarks_{generation:06d}.shard{number:04d}.npz'
+    tmp_path = os.path.join(output_dir, f'{name}.tmp')
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, landmarks=landmarks, labels=labels, meta=np.array(json.dumps(meta)))
+    os.replace(tmp_path, os.path.join(output_dir, name))
+
+def _save(output_dir, classes, records, arrays, generation):
+    """Write the arrays to a new data file, then point the index at it
+
+    The previous data file and checkpoint shards stay until the index is
+    replaced, so a build interrupted at any point leaves a consistent
+    dataset behind.
+    """
+    landmarks, labels = _pack(records, arrays, sorted(records))
+
+    try:
+        old_file = _read_index(output_dir).get('data_file')
+    except (OSError, ValueError):
+        old_file = None
+    data_file = f'landmarks_{generation:06d}.npz'
+    np.savez(os.path.join(output_dir, data_file), landmarks=landmarks, labels=labels)
+
+    index = {'version': DATASET_VERSION, 'classes': classes, 'data_file': data_file, 'files': records}
+    with open(os.path.join(output_dir, f'{INDEX_NAME}.tmp'), 'w') as f:
+        json.dump(index, f)
+    os.replace(os.path.join(output_dir, f'{INDEX_NAME}.tmp'), os.path.join(output_dir, INDEX_NAME))
+    stale = [name for _, _, name in _shard_files(output_dir)]
+    stale += [name for name in os.listdir(output_dir) if name.endswith('.npz.tmp')]
+    if old_file and old_file != data_file:
+        stale.append(old_file)
+    for name in stale:
+        try:
+            os.remove(os.path.join(output_dir, name))
+        except OSError:
+            pass
+
+def _load_previous(output_dir, classes):
+    """Records, per-file landmark rows, data file generation and next shard number of an earlier build
+
+    Includes the checkpoint shards an interrupted build left on top of
+    the data file; anything built for other classes is ignored.
+    """
+    records, arrays, generation = {}, {}, 0
+    try:
+        index = _read_index(output_dir)
+        if index.get('version') == DATASET_VERSION and index['classes'] == classes:
+            with np.load(os.path.join(output_dir, index['data_file'])) as data:
+                landmarks = data['landmarks']
+            generation = int(index['data_file'].split('_')[1].split('.')[0])
+            records = index['files']
+    except (OSError, ValueError, KeyError):
+        records = {}
+    arrays = {
+        f: landmarks[r['offset']:r['offset'] + r['rows']]
+        for f, r in records.items()
+    }
+
+    next_shard = 0
+    for shard_generation, number, name in _shard_files(output_dir):
+        if shard_generation != generation:
+            continue
+        try:
+            with np.load(os.path.join(output_dir, name)) as data:
+                meta = json.loads(str(data['meta']))
+                landmarks = data['landmarks']
+        except (OSError, ValueError, KeyError):
+            continue
+        if meta.get('version') != DATASET_VERSION or meta['classes'] != classes:
+            continue
+        for f, r in meta['files'].items():
+            records[f] = r
+            arrays[f] = landmarks[r['offset']:r['offset'] + r['rows']]
+        next_shard = number + 1
+    return records, arrays, generation, next_shard
+
+def build_landmark_dataset(data_dir, output_dir=None, workers=None, frame_step=5, checkpoint_every=500):
+    """Extract landmarks of every image and video under data_dir/<class>/ into output_dir
+
+    Runs MediaPipe in a process pool with one Hands instance per worker.
+    Files already extracted by an earlier run are skipped when their
+    mtime and size are unchanged, or when their content hash still
+    matches; files finished since the last checkpoint are saved to a
+    shard every checkpoint_every files so an interrupted build resumes
+    where it stopped. Returns output_dir.
+    """
+    output_dir = output_dir or os.path.normpath(data_dir) + '_landmarks'
+    os.makedirs(output_dir, exist_ok=True)
+    sources, classes = list_sources(data_dir)
+    previous, previous_arrays, generation, next_shard = _load_previous(output_dir, classes)
+
+    records = {}
+    arrays = {}
+    unsaved = []
+    pending = []
+    for rel_path, label_idx in sources:
+        stat = os.stat(os.path.join(data_dir, rel_path))
+        old = previous.get(rel_path)
+        if old is not None:
+            unchanged = old['mtime_ns'] == stat.st_mtime_ns and old['size'] == stat.st_size
+            if unchanged or old['sha256'] == file_sha256(os.path.join(data_dir, rel_path)):
+                records[rel_path] = {**old, 'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+                arrays[rel_path] = previous_arrays[rel_path]
+                continue
+        pending.append((rel_path, label_idx, stat))
+
+    print(f'{len(sources)} files, {len(records)} already extracted, {len(pending)} to process')
+    if pending:
+        # Spawn: MediaPipe graphs do not survive a fork
+        with ProcessPoolExecutor(
+            max_workers=workers or os.cpu_count(),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker
+        ) as executor:
+            futures = {
+                executor.submit(extract_file, os.path.join(data_dir, rel_path), frame_step): (rel_path, label_idx, stat)
+                for rel_path, label_idx, stat in pending
+            }
+            for done, future in enumerate(tqdm(as_completed(futures), total=len(futures)), start=1):
+                rel_path, label_idx, stat = futures[future]
+                try:
+                    landmarks, sha256 = future.result()
+                except Exception as e:
+                    print(f'Error processing {rel_path}: {e}')
+                    continue
+                records[rel_path] = {
+                    'label': label_idx,
+                    'mtime_ns': stat.st_mtime_ns,
+                    'size': stat.st_size,
+                    'sha256': sha256
+                }
+                arrays[rel_path] = landmarks
+                unsaved.append(rel_path)
+                if done % checkpoint_every == 0:
+                    _save_shard(output_dir, classes, records, arrays, unsaved, generation, next_shard)
+                    next_shard += 1
+                    unsaved = []
+
+    if pending or records != previous or next_shard:
+        _save(output_dir, classes, records, arrays, generation + 1)
+    return output_dir
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(description='Extract hand landmarks of an image/video dataset')
+    parser.add_argument('--data_dir', type=str, required=True, help='Directory with one subdirectory per class')
+    parser.add_argument('--output_dir', type=str, default=None, help='Defaults to <data_dir>_landmarks')
+    parser.add_argument('--workers', type=int, default=None, help='Worker processes (defaults to CPU count)')
+    parser.add_argument('--frame_step', type=int, default=5, help='Use every n-th frame of videos')
+
+    args = parser.parse_args()
+    output_dir = build_landmark_dataset(args.data_dir, args.output_dir, args.workers, args.frame_step)
+    landmarks, labels, classes = load_landmark_dataset(output_dir)
+    print(f'{len(labels)} samples of {len(classes)} classes in {output_dir}')
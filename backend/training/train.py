@@ -1,4 +1,6 @@
 import os
+import json
+import time
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -9,135 +11,353 @@ from tqdm import tqdm
 import sys
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from models.gesture_model import GestureRecognitionModel, GestureDataset
-from utils.preprocessing import augment_data
+from models.gesture_model import (
+    GESTURE_MAP, GestureDataset, MODEL_INPUT_SHAPES, PRETRAINED_MODEL_PATHS, create_model
+)
+from training.dataset_cache import (
+    ImageShardCache, ShardedImageDataset, build_image_cache, cache_is_current, normalize_images
+)
+from training.landmark_dataset import build_landmark_dataset, load_landmark_dataset
+from utils.preprocessing import augment_batch
 
-def prepare_data(data_dir, img_size=(224, 224)):
-    """Prepare training data from directory structure"""
-    landmarks = []
-    labels = []
-    
-    for label_idx, class_name in enumerate(sorted(os.listdir(data_dir))):
-        class_dir = os.path.join(data_dir, class_name)
-        if not os.path.isdir(class_dir):
-            continue
-            
-        print(f"Processing class {class_name}...")
-        for img_name in tqdm(os.listdir(class_dir)):
-            img_path = os.path.join(class_dir, img_name)
-            try:
-                img = cv2.imread(img_path)
-                if img is None:
-                    continue
-                img = cv2.resize(img, img_size)
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-                img = img.transpose((2, 0, 1)) / 255.0  # Convert to CHW format
-                
-                landmarks.append(img)
-                labels.append(label_idx)
-            except Exception as e:
-                print(f"Error processing {img_path}: {e}")
-                
-    return np.array(landmarks), np.array(labels)
-
-def train_model(model, train_loader, val_loader, num_epochs=50, device='cuda'):
-    """Train the gesture recognition model"""
+def prepare_data(data_dir, img_size=(224, 224), cache_dir=None, rebuild=False):
+    """Memory-mapped uint8 image cache of a directory structure, built when images changed"""
+    cache_dir = cache_dir or os.path.normpath(data_dir) + '_cache'
+    if rebuild or not cache_is_current(data_dir, cache_dir, img_size):
+        print(f"Building image cache in {cache_dir}...")
+        build_image_cache(data_dir, cache_dir, img_size)
+    return ImageShardCache(cache_dir)
+
+def prepare_landmark_data(data_dir, output_dir=None, workers=None):
+    """Normalized 63-value hand landmarks, labels and class names of a directory of images and videos
+
+    Landmarks are extracted in parallel; only files added or changed since
+    the last run are processed again.
+    """
+    return load_landmark_dataset(build_landmark_dataset(data_dir, output_dir, workers))
+
+class LandmarkAugmenter:
+    """Augment each (B, 63) landmark batch on the fly; a seed makes runs reproducible"""
+
+    def __init__(self, seed=None):
+        self.rng = np.random.default_rng(seed)
+
+    def __call__(self, inputs):
+        return torch.from_numpy(augment_batch(inputs.numpy(), self.rng))
+
+    def state_dict(self):
+        return {'rng': self.rng.bit_generator.state}
+
+    def load_state_dict(self, state):
+        self.rng.bit_generator.state = state['rng']
+
+def gesture_label_map(classes):
+    """GESTURE_MAP index of each dataset class, so outputs mean what the server reads them as
+
+    Dataset classes are sorted folder names, while the server maps output
+    indices through GESTURE_MAP; every folder must be named after one of
+    its gestures.
+    """
+    indices = {name: idx for idx, name in GESTURE_MAP.items()}
+    unknown = [name for name in classes if name not in indices]
+    if unknown:
+        raise ValueError(f'Classes {unknown} are not gestures of GESTURE_MAP: {sorted(indices)}')
+    return np.array([indices[name] for name in classes], dtype=np.int64)
+
+def checkpoint_path_for(model_path):
+    return os.path.splitext(model_path)[0] + '.checkpoint.pth'
+
+def metadata_path_for(model_path):
+    """JSON sidecar describing a trained model file"""
+    return os.path.splitext(model_path)[0] + '.json'
+
+def write_metadata(model_path, metadata):
+    path = metadata_path_for(model_path)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(metadata, f, indent=2)
+    os.replace(f'{path}.tmp', path)
+
+def make_loader(dataset, batch_size, shuffle=False, num_workers=0, prefetch_factor=4, pin_memory=False):
+    """DataLoader whose workers stay alive across epochs and read prefetch_factor batches ahead"""
+    options = {}
+    if num_workers > 0:
+        options = {'persistent_workers': True, 'prefetch_factor': prefetch_factor}
+    return DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, num_workers=num_workers,
+                      pin_memory=pin_memory, **options)
+
+def train_model(model, train_loader, val_loader, num_epochs=50, device='cuda',
+                best_model_path='pretrained_gesture_model.pth', augment=None,
+                accumulation_steps=1, bf16=False, patience=None, checkpoint_path=None,
+                checkpoint_every=1, resume=False, metadata=None):
+    """Train the gesture recognition model, applying augment to each CPU training batch if given
+
+    With accumulation_steps > 1 the optimizer steps once every that many
+    batches, for a larger effective batch size. bf16 runs forward passes
+    under bfloat16 autocast, which is faster on CPUs with bf16 support.
+    Losses and accuracy are summed on the device and read once per epoch.
+
+    Training stops early once val_loss, which also drives the learning
+    rate schedule, has not improved for patience epochs. Every
+    checkpoint_every epochs the model, optimizer, scheduler and RNG
+    states go to checkpoint_path, from which resume=True continues. The
+    best weights are saved as a plain state_dict next to a JSON sidecar
+    holding metadata plus the training history. Returns the history.
+    """
     criterion = nn.CrossEntropyLoss()
     optimizer = optim.Adam(model.parameters(), lr=0.001)
     scheduler = optim.lr_scheduler.ReduceLROnPlateau(optimizer, mode='min', patience=5)
+    device_type = torch.device(device).type
+    non_blocking = device_type == 'cuda'
+    checkpoint_path = checkpoint_path or checkpoint_path_for(best_model_path)
+    metadata = dict(metadata or {})
     
     best_val_loss = float('inf')
-    best_model_path = 'pretrained_gesture_model.pth'
+    best_epoch = None
+    epochs_without_improvement = 0
+    history = []
+    start_epoch = 0
     
     model = model.to(device)
     
-    for epoch in range(num_epochs):
+    if resume and os.path.exists(checkpoint_path):
+        checkpoint = torch.load(checkpoint_path, map_location=device, weights_only=False)
+        model.load_state_dict(checkpoint['model'])
+        optimizer.load_state_dict(checkpoint['optimizer'])
+        scheduler.load_state_dict(checkpoint['scheduler'])
+        if augment is not None and hasattr(augment, 'load_state_dict') and checkpoint.get('augment'):
+            augment.load_state_dict(checkpoint['augment'])
+        torch.set_rng_state(checkpoint['torch_rng'])
+        start_epoch = checkpoint['epoch']
+        best_val_loss = checkpoint['best_val_loss']
+        best_epoch = checkpoint['best_epoch']
+        epochs_without_improvement = checkpoint['epochs_without_improvement']
+        history = checkpoint['history']
+        print(f'Resumed from {checkpoint_path} after epoch {start_epoch}')
+    elif resume:
+        print(f'No checkpoint at {checkpoint_path}, starting from scratch')
+    
+    def save_checkpoint(epoch):
+        state = {
+            'epoch': epoch,
+            'model': model.state_dict(),
+            'optimizer': optimizer.state_dict(),
+            'scheduler': scheduler.state_dict(),
+            'augment': augment.state_dict() if hasattr(augment, 'state_dict') else None,
+            'torch_rng': torch.get_rng_state(),
+            'best_val_loss': best_val_loss,
+            'best_epoch': best_epoch,
+            'epochs_without_improvement': epochs_without_improvement,
+            'history': history
+        }
+        # Write then rename so an interruption never leaves a truncated checkpoint
+        torch.save(state, f'{checkpoint_path}.tmp')
+        os.replace(f'{checkpoint_path}.tmp', checkpoint_path)
+    
+    def save_metadata(stopped=None):
+        best = history[best_epoch - 1] if best_epoch else None
+        write_metadata(best_model_path, {
+            **metadata,
+            'best_epoch': best_epoch,
+            'best_metrics': best,
+            'epochs_run': len(history),
+            'stopped': stopped,
+            'history': history
+        })
+    
+    for epoch in range(start_epoch, num_epochs):
         # Training phase
         model.train()
-        train_loss = 0
-        train_correct = 0
+        train_loss = torch.zeros((), device=device)
+        train_correct = torch.zeros((), dtype=torch.long, device=device)
         train_total = 0
+        started = time.perf_counter()
         
-        for inputs, labels in tqdm(train_loader, desc=f'Epoch {epoch+1}/{num_epochs}'):
-            inputs, labels = inputs.to(device), labels.to(device)
+        optimizer.zero_grad(set_to_none=True)
+        num_batches = len(train_loader)
+        for step, (inputs, labels) in enumerate(tqdm(train_loader, desc=f'Epoch {epoch+1}/{num_epochs}')):
+            if augment is not None:
+                inputs = augment(inputs)
+            inputs = inputs.to(device, non_blocking=non_blocking)
+            labels = labels.to(device, non_blocking=non_blocking)
+            if inputs.dtype == torch.uint8:
+                inputs = normalize_images(inputs)
             
-            optimizer.zero_grad()
-            outputs = model(inputs)
-            loss = criterion(outputs, labels)
-            loss.backward()
-            optimizer.step()
+            with torch.autocast(device_type=device_type, dtype=torch.bfloat16, enabled=bf16):
+                outputs = model(inputs)
+                loss = criterion(outputs, labels)
+            # The last group of an epoch may hold fewer batches; average over the ones it has
+            group_size = min(accumulation_steps, num_batches - step // accumulation_steps * accumulation_steps)
+            (loss / group_size).backward()
+            if (step + 1) % accumulation_steps == 0 or step + 1 == num_batches:
+                optimizer.step()
+                optimizer.zero_grad(set_to_none=True)
             
-            train_loss += loss.item()
-            _, predicted = outputs.max(1)
+            train_loss += loss.detach()
+            train_correct += outputs.argmax(1).eq(labels).sum()
             train_total += labels.size(0)
-            train_correct += predicted.eq(labels).sum().item()
+        train_seconds = time.perf_counter() - started
         
         # Validation phase
         model.eval()
-        val_loss = 0
-        val_correct = 0
+        val_loss = torch.zeros((), device=device)
+        val_correct = torch.zeros((), dtype=torch.long, device=device)
         val_total = 0
         
-        with torch.no_grad():
+        with torch.no_grad(), torch.autocast(device_type=device_type, dtype=torch.bfloat16, enabled=bf16):
             for inputs, labels in val_loader:
-                inputs, labels = inputs.to(device), labels.to(device)
+                inputs = inputs.to(device, non_blocking=non_blocking)
+                labels = labels.to(device, non_blocking=non_blocking)
+                if inputs.dtype == torch.uint8:
+                    inputs = normalize_images(inputs)
                 outputs = model(inputs)
-                loss = criterion(outputs, labels)
-                
-                val_loss += loss.item()
-                _, predicted = outputs.max(1)
+                val_loss += criterion(outputs, labels)
+                val_correct += outputs.argmax(1).eq(labels).sum()
                 val_total += labels.size(0)
-                val_correct += predicted.eq(labels).sum().item()
         
-        train_loss = train_loss / len(train_loader)
-        train_acc = 100. * train_correct / train_total
-        val_loss = val_loss / len(val_loader)
-        val_acc = 100. * val_correct / val_total
+        train_loss = train_loss.item() / len(train_loader)
+        train_acc = 100. * train_correct.item() / train_total
+        val_loss = val_loss.item() / len(val_loader)
+        val_acc = 100. * val_correct.item() / val_total
         
         print(f'Epoch {epoch+1}/{num_epochs}:')
-        print(f'Train Loss: {train_loss:.4f}, Train Acc: {train_acc:.2f}%')
+        print(f'Train Loss: {train_loss:.4f}, Train Acc: {train_acc:.2f}%, '
+              f'{train_total / train_seconds:.0f} samples/s')
         print(f'Val Loss: {val_loss:.4f}, Val Acc: {val_acc:.2f}%')
         
+        history.append({
+            'epoch': epoch + 1,
+            'train_loss': train_loss,
+            'train_acc': train_acc,
+            'val_loss': val_loss,
+            'val_acc': val_acc,
+            'lr': optimizer.param_groups[0]['lr'],
+            'samples_per_sec': train_total / train_seconds
+        })
         scheduler.step(val_loss)
         
         # Save best model
         if val_loss < best_val_loss:
             best_val_loss = val_loss
+            best_epoch = epoch + 1
+            epochs_without_improvement = 0
             torch.save(model.state_dict(), best_model_path)
+            save_metadata()
             print(f'Saved best model with validation loss: {val_loss:.4f}')
+        else:
+            epochs_without_improvement += 1
+        
+        stop = patience and epochs_without_improvement >= patience
+        if stop or (epoch + 1) % checkpoint_every == 0 or epoch + 1 == num_epochs:
+            save_checkpoint(epoch + 1)
+        if stop:
+            print(f'Stopping early: no improvement in validation loss for {patience} epochs')
+            save_metadata(stopped='early_stopping')
+            return history
+    
+    save_metadata(stopped='completed')
+    return history
 
 if __name__ == '__main__':
     import argparse
     parser = argparse.ArgumentParser(description='Train gesture recognition model')
     parser.add_argument('--data_dir', type=str, required=True, help='Path to training data directory')
+    parser.add_argument('--model', type=str, default='landmark', choices=['landmark', 'cnn'],
+                        help='Landmark MLP or image CNN')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Where to save the best model (defaults to the pretrained model path)')
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Image cache for the CNN (defaults to <data_dir>_cache)')
+    parser.add_argument('--rebuild_cache', action='store_true', help='Rebuild the image cache')
+    parser.add_argument('--landmark_dir', type=str, default=None,
+                        help='Extracted landmarks (defaults to <data_dir>_landmarks)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Landmark extraction processes (defaults to CPU count)')
     parser.add_argument('--batch_size', type=int, default=32, help='Batch size')
     parser.add_argument('--num_epochs', type=int, default=50, help='Number of epochs')
+    parser.add_argument('--no_augment', action='store_true', help='Train on the landmarks as extracted')
+    parser.add_argument('--seed', type=int, default=42, help='Seed for shuffling, initialization and augmentation')
+    parser.add_argument('--loader_workers', type=int, default=None,
+                        help='DataLoader processes (defaults to 0 for landmarks, up to 4 for images)')
+    parser.add_argument('--prefetch_factor', type=int, default=4, help='Batches each loader worker reads ahead')
+    parser.add_argument('--accumulation_steps', type=int, default=1,
+                        help='Batches per optimizer step (effective batch size = batch_size * steps)')
+    parser.add_argument('--bf16', action='store_true', help='Train under bfloat16 autocast')
+    parser.add_argument('--patience', type=int, default=10,
+                        help='Stop after this many epochs without a better validation loss (0 disables)')
+    parser.add_argument('--checkpoint', type=str, default=None,
+                        help='Training checkpoint (defaults to <output>.checkpoint.pth)')
+    parser.add_argument('--checkpoint_every', type=int, default=1, help='Epochs between checkpoints')
+    parser.add_argument('--resume', action='store_true', help='Continue from the checkpoint if it exists')
     parser.add_argument('--device', type=str, default='cuda' if torch.cuda.is_available() else 'cpu',
                         help='Device to train on (cuda/cpu)')
     
     args = parser.parse_args()
     
+    from sklearn.model_selection import train_test_split
+
+    torch.manual_seed(args.seed)
+    augment = None
+
     # Prepare data
     print("Preparing training data...")
-    landmarks, labels = prepare_data(args.data_dir)
-    
-    # Data augmentation
-    print("Applying data augmentation...")
-    landmarks, labels = augment_data(landmarks, labels)
-    
-    # Split data
-    from sklearn.model_selection import train_test_split
-    train_landmarks, val_landmarks, train_labels, val_labels = train_test_split(
-        landmarks, labels, test_size=0.2, random_state=42)
-    
-    # Create datasets
-    train_dataset = Gesture dataset(train_landmarks, train_labels)
-    val_dataset = GestureDataset(val_landmarks, val_labels)
+    if args.model == 'landmark':
+        landmarks, labels, classes = prepare_landmark_data(args.data_dir, args.landmark_dir, args.workers)
+        try:
+            labels = gesture_label_map(classes)[labels]
+        except ValueError as e:
+            parser.error(str(e))
+        input_format = 'normalized hand landmarks, 21 (x, y, z) points flattened to 63 float32 values'
+
+        # Split data; training batches are augmented on the fly, validation stays as extracted
+        train_landmarks, val_landmarks, train_labels, val_labels = train_test_split(
+            landmarks, labels, test_size=0.2, random_state=42)
+        if not args.no_augment:
+            augment = LandmarkAugmenter(args.seed)
+
+        # Create datasets
+        train_dataset = GestureDataset(train_landmarks, train_labels)
+        val_dataset = GestureDataset(val_landmarks, val_labels)
+    else:
+        # Images stay on disk; batches are read from the memory-mapped cache
+        cache = prepare_data(args.data_dir, cache_dir=args.cache_dir, rebuild=args.rebuild_cache)
+        classes = cache.classes
+        try:
+            label_map = gesture_label_map(classes)
+        except ValueError as e:
+            parser.error(str(e))
+        input_format = 'RGB image, 3x224x224, uint8 scaled to float [0, 1]'
+        train_idx, val_idx = train_test_split(np.arange(len(cache)), test_size=0.2, random_state=42)
+        train_dataset = ShardedImageDataset(cache, train_idx, label_map)
+        val_dataset = ShardedImageDataset(cache, val_idx, label_map)
     
-    # Create data loaders
-    train_loader = DataLoader(train_dataset, batch_size=args.batch_size, shuffle=True)
-    val_loader = DataLoader(val_dataset, batch_size=args.batch_size)
+    # Create data loaders; landmark batches are in memory already, so workers would only add IPC
+    loader_workers = args.loader_workers
+    if loader_workers is None:
+        loader_workers = 0 if args.model == 'landmark' else min(4, os.cpu_count() or 1)
+    loader_options = {
+        'num_workers': loader_workers,
+        'prefetch_factor': args.prefetch_factor,
+        'pin_memory': args.device.startswith('cuda')
+    }
+    train_loader = make_loader(train_dataset, args.batch_size, shuffle=True, **loader_options)
+    val_loader = make_loader(val_dataset, args.batch_size, **loader_options)
     
-    # Initialize and train model
-    model = GestureRecognitionModel(num_classes=10)
-    train_model(model, train_loader, val_loader, num_epochs=args.num_epochs, device=args.device)
+    # Initialize and train model; outputs are the gestures of GESTURE_MAP, in its order
+    num_classes = len(GESTURE_MAP)
+    metadata = {
+        'model_type': args.model,
+        'classes': [GESTURE_MAP[idx] for idx in range(num_classes)],
+        'dataset_classes': classes,
+        'num_classes': num_classes,
+        'input_shape': list(MODEL_INPUT_SHAPES[args.model]),
+        'input_format': input_format,
+        'train_samples': len(train_dataset),
+        'val_samples': len(val_dataset),
+        'args': vars(args)
+    }
+    model = create_model(args.model, num_classes=num_classes)
+    train_model(model, train_loader, val_loader, num_epochs=args.num_epochs, device=args.device,
+                best_model_path=args.output or PRETRAINED_MODEL_PATHS[args.model], augment=augment,
+                accumulation_steps=args.accumulation_steps, bf16=args.bf16, patience=args.patience,
+                checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every,
+                resume=args.resume, metadata=metadata)
@@ -1,35 +1,99 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from datetime import datetime, timedelta
-from typing import Optional, Dict
-from database.mongodb import MongoDB
-from config import settings
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+import time
+from database.mongodb import get_database
+from config.settings import settings
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token", auto_error=False)
+
+class UserCache:
+    """Short-lived cache from token to user, so repeated requests skip JWT decoding and the database.
+
+    An entry expires after ttl seconds or when its token does, whichever
+    comes first; the least recently used entries go beyond max_entries.
+    """
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(token)
+        if entry is None or entry[0] <= time.time():
+            if entry is not None:
+                del self._entries[token]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(token)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, token: str, user: Dict[str, Any], token_expires: Optional[float] = None):
+        expires = time.time() + self.ttl
+        if token_expires is not None:
+            expires = min(expires, token_expires)
+        self._entries[token] = (expires, user)
+        self._entries.move_to_end(token)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_user(self, user_id: str):
+        """Drop every cached token of a user, e.g. after the account changed."""
+        for token in [t for t, (_, user) in self._entries.items() if str(user.get("_id")) == user_id]:
+            del self._entries[token]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+user_cache = UserCache(settings.AUTH_CACHE_TTL_SECONDS, settings.AUTH_CACHE_MAX_ENTRIES)
+
+async def authenticate_token(token: str) -> Optional[Dict]:
+    """User a bearer token belongs to, or None if it is invalid."""
+    user = user_cache.get(token)
+    if user is not None:
+        return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
-    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-            
-        # Initialize MongoDB connection
-        db = MongoDB(settings.MONGODB_URL)
-        
-        # Get user from database
-        user = await db.get_user(user_id)
-        if user is None:
-            raise credentials_exception
-            
-        return user
-        
     except JWTError:
-        raise credentials_exception
+        return None
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        return None
+
+    # Get user from database
+    user = await get_database().get_user(user_id)
+    if user is None:
+        return None
+
+    user_cache.put(token, user, payload.get("exp"))
+    return user
+
+async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict:
+    user = await authenticate_token(token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+async def get_optional_user(token: Optional[str] = Depends(optional_oauth2_scheme)) -> Optional[Dict]:
+    """User of the bearer token, or None without one; an invalid token is still rejected."""
+    if token is None:
+        return None
+    return await get_current_user(token)
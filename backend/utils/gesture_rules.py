@@ -0,0 +1,83 @@
+import numpy as np
+from typing import Dict, List, Tuple
+
+# Landmark indices of each finger, from base to tip
+FINGER_INDICES = {
+    'THUMB': [1, 2, 3, 4],
+    'INDEX': [5, 6, 7, 8],
+    'MIDDLE': [9, 10, 11, 12],
+    'RING': [13, 14, 15, 16],
+    'PINKY': [17, 18, 19, 20]
+}
+FINGER_BASES = np.array([indices[0] for indices in FINGER_INDICES.values()])
+FINGER_TIPS = np.array([indices[-1] for indices in FINGER_INDICES.values()])
+
+DISTANCE_THRESHOLD = 0.1
+
+# Rule table indexed by a 5-bit finger code (bit 0 = thumb ... bit 4 = pinky)
+RULE_GESTURES = ["no_gesture", "point_right", "point_left", "draw", "open_hand", "stop"]
+_RULES = {
+    0b00010: ("point_right", 0.95),  # index only
+    0b10000: ("point_left", 0.95),   # pinky only
+    0b00110: ("draw", 0.9),          # index and middle
+    0b11111: ("open_hand", 0.95),    # all fingers
+    0b00000: ("stop", 0.95),         # fist
+}
+RULE_GESTURE_BY_CODE = np.zeros(32, dtype=np.int64)
+RULE_CONFIDENCE_BY_CODE = np.zeros(32, dtype=np.float32)
+for _code, (_gesture, _confidence) in _RULES.items():
+    RULE_GESTURE_BY_CODE[_code] = RULE_GESTURES.index(_gesture)
+    RULE_CONFIDENCE_BY_CODE[_code] = _confidence
+_FINGER_BITS = 1 << np.arange(5)
+
+
+def as_points(landmarks) -> np.ndarray:
+    """Convert landmarks to a float32 (..., 21, 3) array.
+
+    Accepts arrays shaped (21, 3), (63,), (N, 21, 3) or (N, 63), or a
+    sequence of 21 objects with x, y and z attributes.
+    """
+    if not isinstance(landmarks, np.ndarray):
+        landmarks = np.array([[lm.x, lm.y, lm.z] for lm in landmarks])
+    points = np.asarray(landmarks, dtype=np.float32)
+    if points.shape[-1] != 3:
+        points = points.reshape(points.shape[:-1] + (21, 3))
+    if points.shape[-2:] != (21, 3):
+        raise ValueError(f"Expected 21x3 landmarks, got shape {points.shape}")
+    return points
+
+
+def normalize_landmarks(points: np.ndarray) -> np.ndarray:
+    """Translate each hand to its wrist and scale it to unit size."""
+    points = points - points[..., :1, :]
+    max_dist = np.linalg.norm(points, axis=-1).max(axis=-1, keepdims=True)
+    max_dist = np.where(max_dist > 0, max_dist, 1.0)
+    return points / max_dist[..., None]
+
+
+def hand_features(points: np.ndarray) -> Dict[str, np.ndarray]:
+    """Finger extension, palm direction and finger angles of (..., 21, 3) hands."""
+    normalized = normalize_landmarks(points)
+    bases = normalized[..., FINGER_BASES, :]
+    tips = normalized[..., FINGER_TIPS, :]
+
+    return {
+        # A finger is extended when its tip is clearly above its base
+        "extended": tips[..., 1] < bases[..., 1] - DISTANCE_THRESHOLD,
+        # Wrist to middle finger base, in image coordinates
+        "palm_direction": points[..., 9, :2] - points[..., 0, :2],
+        "finger_angles": np.arctan2(tips[..., 1] - bases[..., 1], tips[..., 0] - bases[..., 0])
+    }
+
+
+def classify(points: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Rule-based gesture index (into RULE_GESTURES) and confidence per hand."""
+    extended = hand_features(points)["extended"]
+    codes = (extended * _FINGER_BITS).sum(axis=-1)
+    return RULE_GESTURE_BY_CODE[codes], RULE_CONFIDENCE_BY_CODE[codes]
+
+
+def classify_batch(landmarks) -> Tuple[List[str], np.ndarray]:
+    """Classify an (N, 21, 3) batch, e.g. to re-score a recorded session."""
+    gesture_idx, confidence = classify(as_points(landmarks).reshape(-1, 21, 3))
+    return [RULE_GESTURES[i] for i in gesture_idx], confidence
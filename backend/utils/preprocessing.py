@@ -1,8 +1,7 @@
 import numpy as np
 import cv2
 import mediapipe as mp
-from typing import List, Tuple
-import random
+from typing import List, Optional, Tuple
 
 def preprocess_landmarks(landmarks) -> np.ndarray:
     """Convert MediaPipe landmarks to normalized numpy array."""
@@ -19,54 +18,81 @@ def preprocess_landmarks(landmarks) -> np.ndarray:
     
     return points
 
-def load_dataset(dataset_path: str) -> Tuple[np.ndarray, np.ndarray]:
-    """Load and preprocess dataset from given path."""
-    # Implementation depends on dataset format
-    # This is a placeholder for the actual implementation
-    landmarks = []
-    labels = []
-    
-    # Process each video/image in the dataset
-    # Extract landmarks using MediaPipe
-    # Normalize coordinates
-    # Add to arrays
-    
-    return np.array(landmarks), np.array(labels)
+def load_dataset(dataset_path: str, output_dir: str = None, workers: int = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Load normalized landmarks and labels of a dataset with one subdirectory of images/videos per class.
+
+    Landmarks are extracted once into output_dir (default <dataset_path>_landmarks);
+    later calls only process files that were added or changed.
+    """
+    from training.landmark_dataset import build_landmark_dataset, load_landmark_dataset
+
+    landmarks, labels, _ = load_landmark_dataset(build_landmark_dataset(dataset_path, output_dir, workers))
+    return landmarks, labels
+
+def augment_batch(
+    landmarks: np.ndarray,
+    rng: np.random.Generator,
+    p: float = 0.8,
+    max_angle: float = 15.0,
+    scale_range: Tuple[float, float] = (0.9, 1.1),
+    max_shift: float = 0.1,
+    sigma: float = 0.01
+) -> np.ndarray:
+    """Randomly rotate, scale, translate and add noise to a batch of landmarks.
+
+    Takes (B, 63) or (B, 21, 3) landmarks and returns a new array of the same
+    shape; each sample is augmented with probability p and keeps its original
+    values otherwise. Draws every random value from rng, so a seeded generator
+    reproduces the same augmentations.
+    """
+    shape = np.shape(landmarks)
+    points = np.asarray(landmarks, dtype=np.float32).reshape(shape[0], -1, 3)
+    n = len(points)
+
+    augmented = _rotate_batch(points, rng.uniform(-max_angle, max_angle, n))
+    augmented *= rng.uniform(*scale_range, (n, 1, 1)).astype(np.float32)
+    augmented[:, :, :2] += rng.uniform(-max_shift, max_shift, (n, 1, 2)).astype(np.float32)
+    augmented += rng.normal(0, sigma, augmented.shape).astype(np.float32)
+
+    keep = rng.random(n) >= p
+    augmented[keep] = points[keep]
+    return augmented.reshape(shape)
 
 def augment_data(
     landmarks: np.ndarray,
-    labels: np.ndarray
+    labels: np.ndarray,
+    seed: Optional[int] = None
 ) -> Tuple[np.ndarray, np.ndarray]:
-    """Apply data augmentation techniques to increase dataset size."""
-    augmented_landmarks = []
-    augmented_labels = []
-    
-    for landmark, label in zip(landmarks, labels):
-        # Original data
-        augmented_landmarks.append(landmark)
-        augmented_labels.append(label)
-        
-        # Random rotation
-        rotated = rotate_landmarks(landmark, angle=random.uniform(-15, 15))
-        augmented_landmarks.append(rotated)
-        augmented_labels.append(label)
-        
-        # Random scaling
-        scaled = scale_landmarks(landmark, scale=random.uniform(0.9, 1.1))
-        augmented_landmarks.append(scaled)
-        augmented_labels.append(label)
-        
-        # Random translation
-        translated = translate_landmarks(landmark, dx=random.uniform(-0.1, 0.1), dy=random.uniform(-0.1, 0.1))
-        augmented_landmarks.append(translated)
-        augmented_labels.append(label)
-        
-        # Add noise
-        noisy = add_noise(landmark, sigma=0.01)
-        augmented_landmarks.append(noisy)
-        augmented_labels.append(label)
-    
-    return np.array(augmented_landmarks), np.array(augmented_labels)
+    """Apply data augmentation techniques to increase dataset size.
+
+    Returns the originals followed by rotated, scaled, translated and noisy
+    copies (5x the input). Prefer augment_batch during training, which
+    augments each batch on the fly instead of storing every variant.
+    """
+    rng = np.random.default_rng(seed)
+    points = np.asarray(landmarks, dtype=np.float32).reshape(len(landmarks), -1, 3)
+    n = len(points)
+
+    translated = points.copy()
+    translated[:, :, :2] += rng.uniform(-0.1, 0.1, (n, 1, 2))
+    variants = [
+        points,
+        _rotate_batch(points, rng.uniform(-15, 15, n)),
+        points * rng.uniform(0.9, 1.1, (n, 1, 1)).astype(np.float32),
+        translated,
+        points + rng.normal(0, 0.01, points.shape).astype(np.float32)
+    ]
+    augmented = np.concatenate(variants).reshape(5 * n, *np.shape(landmarks)[1:])
+    return augmented, np.tile(np.asarray(labels), 5)
+
+def _rotate_batch(points: np.ndarray, angles: np.ndarray) -> np.ndarray:
+    """Rotate each (21, 3) sample of a batch about the z axis by its own angle in degrees."""
+    theta = np.radians(angles).astype(np.float32)[:, None]
+    c, s = np.cos(theta), np.sin(theta)
+    rotated = points.copy()
+    rotated[:, :, 0] = c * points[:, :, 0] - s * points[:, :, 1]
+    rotated[:, :, 1] = s * points[:, :, 0] + c * points[:, :, 1]
+    return rotated
 
 def rotate_landmarks(landmarks: np.ndarray, angle: float) -> np.ndarray:
     """Rotate landmarks by given angle in degrees."""
@@ -95,10 +121,10 @@ def translate_landmarks(
     dy: float
 ) -> np.ndarray:
     """Translate landmarks by given amounts in x and y directions."""
-    landmarks = landmarks.reshape(-1, 3)
-    landmarks[:, 0] += dx
-    landmarks[:, 1] += dy
-    return landmarks.flatten()
+    translated = landmarks.reshape(-1, 3).copy()
+    translated[:, 0] += dx
+    translated[:, 1] += dy
+    return translated.flatten()
 
 def add_noise(landmarks: np.ndarray, sigma: float) -> np.ndarray:
     """Add Gaussian noise to landmarks."""
@@ -0,0 +1,118 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import AsyncIterator, Collection, Tuple
+
+
+class UploadTooLarge(ValueError):
+    """Upload exceeded the configured size limit."""
+
+
+async def save_stream(
+    chunks: AsyncIterator[bytes],
+    directory: str,
+    suffix: str,
+    max_bytes: int
+) -> Tuple[str, str]:
+    """Write chunks to a temp file, hashing them as they arrive; returns (path, sha256).
+
+    Stops reading and removes the file as soon as more than max_bytes
+    arrived, so an oversized upload never sits in memory or on disk.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, path = tempfile.mkstemp(suffix=suffix, dir=directory)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(path)
+        raise
+    return path, digest.hexdigest()
+
+
+class UploadSizeLimit:
+    """ASGI middleware rejecting request bodies over max_bytes on the given paths with 413.
+
+    Multipart bodies are spooled completely before an endpoint runs, so
+    the limit has to apply while they are received: a Content-Length over
+    the limit is rejected before reading, and a body that grows past it
+    is cut off, answered with 413 and seen by the app as a disconnect.
+    """
+
+    def __init__(self, app, paths: Collection[str], max_bytes: int):
+        self.app = app
+        self.paths = set(paths)
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes:
+            await self._reject(send)
+            return
+
+        received = 0
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    rejected = True
+                    await self._reject(send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def guarded_send(message):
+            # The 413 was already sent
+            if not rejected:
+                await send(message)
+
+        try:
+            await self.app(scope, limited_receive, guarded_send)
+        except Exception:
+            # Errors of the app reading the cut-off body; the 413 already answered it
+            if not rejected:
+                raise
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": f"Request body exceeds {self.max_bytes} bytes"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+async def read_chunks(file, chunk_size: int) -> AsyncIterator[bytes]:
+    """Chunks of an UploadFile-like object with an async read(size)."""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
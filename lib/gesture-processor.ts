@@ -40,6 +40,28 @@ export const HAGRID_LABEL_MAP = {
   "call": 3         // palm_out
 }
 
+// Binary packet for the /ws/landmarks endpoint: 21 (x, y, z) little-endian
+// float32 values. An empty packet tells the server no hand is in view.
+export const LANDMARK_PACKET_SIZE = 21 * 3 * 4
+
+export function encodeLandmarkPacket(landmarks: HandLandmark[] | null): ArrayBuffer {
+  if (!landmarks || landmarks.length === 0) {
+    return new ArrayBuffer(0)
+  }
+  if (landmarks.length !== 21) {
+    throw new Error(`Expected 21 landmarks, got ${landmarks.length}`)
+  }
+
+  const buffer = new ArrayBuffer(LANDMARK_PACKET_SIZE)
+  const view = new DataView(buffer)
+  landmarks.forEach((landmark, i) => {
+    view.setFloat32(i * 12, landmark.x, true)
+    view.setFloat32(i * 12 + 4, landmark.y, true)
+    view.setFloat32(i * 12 + 8, landmark.z, true)
+  })
+  return buffer
+}
+
 export class GestureProcessor {
   private modelLoaded = false
   private sensitivity = 0.7